@@ -7,6 +7,7 @@ This ensures students see expected results for every code example.
 import re
 import sys
 from pathlib import Path
+from safe_write import write_text
 
 # Sample outputs for common patterns
 OUTPUTS = {
@@ -210,8 +211,7 @@ def main():
             print(f"  ✓ Added output {i}/{len(outputs)}")
         
         # Write back
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(content)
+        write_text(filepath, content)
         
         print(f"  ✅ Completed {filename}")
         print()
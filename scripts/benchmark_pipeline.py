@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Benchmark the book pipeline stages and flag regressions.
+
+Every run works on a throwaway copy of the book in a temporary directory:
+the real book, and a synthetic book with every chapter replicated --scale
+times. Each stage (strip outputs, fix LaTeX, execute blocks, render the
+figures) runs as its own process, the way it is used, and its wall time is
+recorded. Results are written as JSON and compared with a
+baseline; a stage that is more than --threshold percent (and --min-delta
+seconds) slower than the baseline makes the script exit with status 1, and
+so does a stage that exceeds its absolute time budget (BUDGETS), such as
+the startup of generate_plots.py.
+
+Nothing is downloaded: the harness only needs the book and the scripts.
+
+Usage:
+    python scripts/benchmark_pipeline.py                      # all stages, real + 10x book
+    python scripts/benchmark_pipeline.py --save-baseline      # record a new baseline
+    python scripts/benchmark_pipeline.py --stages remove_outputs,fix_latex --scale 20
+"""
+
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).parent.absolute()
+ROOT_DIR = SCRIPT_DIR.parent
+
+DEFAULT_RESULTS = Path('benchmark_results.json')
+DEFAULT_BASELINE = Path('benchmark_baseline.json')
+DEFAULT_THRESHOLD = 20.0  # percent
+DEFAULT_MIN_DELTA = 0.25  # seconds; smaller slowdowns are noise
+DEFAULT_SCALE = 10
+
+# stage -> seconds it must finish in, whatever the baseline says
+BUDGETS = {
+    'plots_startup': 1.0,  # generate_plots.py --list: imports and the figure registry only
+}
+
+BOOK_PARTS = ['part1', 'part2', 'part3']
+BOOK_FILES = ['_config.yml', '_toc.yml', 'intro.md']
+BOOKS = ['real', 'synthetic']
+
+# name -> (script, whether it takes the chapter files, books it runs on)
+# The figure generator renders a fixed set of figures, so the size of the
+# book doesn't matter to it.
+STAGES = {
+    'remove_outputs': ('remove_all_outputs.py', True, BOOKS),
+    'fix_latex': ('fix_latex.py', True, BOOKS),
+    'execute': ('execute_and_add_outputs.py', True, BOOKS),
+    'generate_plots': ('generate_plots.py', False, ['real']),
+    'plots_startup': ('generate_plots.py', False, ['real']),
+}
+
+def copy_book(target, scale=1):
+    """Copy the book and its scripts to target; chapters are replicated scale times.
+
+    Returns the chapter markdown files of the copy.
+    """
+    for part in BOOK_PARTS:
+        if (ROOT_DIR / part).is_dir():
+            shutil.copytree(ROOT_DIR / part, target / part)
+    for name in BOOK_FILES:
+        if (ROOT_DIR / name).exists():
+            shutil.copy2(ROOT_DIR / name, target / name)
+    shutil.copytree(SCRIPT_DIR, target / 'scripts', ignore=shutil.ignore_patterns('__pycache__'))
+
+    chapters = []
+    for part in BOOK_PARTS:
+        for filepath in sorted((target / part).glob('*.md')) if (target / part).is_dir() else []:
+            chapters.append(filepath.relative_to(target))
+            for copy in range(1, scale):
+                replica = filepath.with_name(f"{filepath.stem}_x{copy}.md")
+                shutil.copyfile(filepath, replica)
+                chapters.append(replica.relative_to(target))
+    return chapters
+
+def stage_command(stage, chapters, jobs):
+    """Build the command line and working directory of a stage (relative to the book copy)."""
+    script, takes_files, _ = STAGES[stage]
+    command = [sys.executable, f"scripts/{script}"]
+    if stage in ('execute', 'generate_plots'):
+        command += ['--jobs', str(jobs)]
+    if stage == 'execute':
+        command += ['--no-cache']
+    if stage == 'plots_startup':
+        command += ['--list']
+    if takes_files:
+        command += [str(path) for path in chapters]
+    return command, Path('.')
+
+def run_stage(stage, book_dir, chapters, jobs):
+    """Run one stage in a book copy. Returns (seconds, ok, output tail)."""
+    command, cwd = stage_command(stage, chapters, jobs)
+    env = dict(os.environ, MPLBACKEND='Agg', PYTHONDONTWRITEBYTECODE='1')
+    start = time.perf_counter()
+    completed = subprocess.run(command, cwd=book_dir / cwd, env=env, capture_output=True, text=True)
+    seconds = time.perf_counter() - start
+    tail = (completed.stdout + completed.stderr).strip().splitlines()[-5:]
+    return seconds, completed.returncode == 0, tail
+
+def run_benchmarks(stages, books, scale, repeat, jobs, log=print):
+    """Time the selected stages on each book. Returns {book: {stage: record}}."""
+    results = {}
+    for book in books:
+        book_stages = [stage for stage in stages if book in STAGES[stage][2]]
+        if not book_stages:
+            continue
+        times = {stage: [] for stage in book_stages}
+        failures = {}
+        chapter_count = 0
+        for run in range(repeat):
+            # Stages change the files, so every repetition starts from a fresh copy
+            with tempfile.TemporaryDirectory(prefix=f'book-bench-{book}-') as tmp:
+                book_dir = Path(tmp)
+                chapters = copy_book(book_dir, scale if book == 'synthetic' else 1)
+                chapter_count = len(chapters)
+                for stage in book_stages:
+                    seconds, ok, tail = run_stage(stage, book_dir, chapters, jobs)
+                    times[stage].append(seconds)
+                    status = "✅" if ok else "❌"
+                    log(f"  {status} {book:>9} {stage:<17} {seconds:8.2f}s  (run {run + 1}/{repeat})")
+                    if not ok:
+                        failures[stage] = tail
+                        for line in tail:
+                            log(f"      {line}")
+        results[book] = {
+            stage: {
+                'seconds': min(times[stage]),
+                'median': statistics.median(times[stage]),
+                'runs': [round(value, 4) for value in times[stage]],
+                'chapters': chapter_count if STAGES[stage][1] else None,
+                'ok': stage not in failures,
+            }
+            for stage in book_stages
+        }
+    return results
+
+def environment_info():
+    """Describe the machine, so baselines from another box can be recognized."""
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+    }
+
+def load_results(path):
+    """Load a results file (None if missing or unreadable)."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def save_results(path, data):
+    """Write results as indented JSON."""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+def find_regressions(results, baseline, threshold, min_delta):
+    """Compare results with a baseline.
+
+    Returns a list of (book, stage, baseline seconds, current seconds,
+    percent change) for stages slower by more than threshold percent and
+    min_delta seconds.
+    """
+    regressions = []
+    for book, stages in results.items():
+        for stage, record in stages.items():
+            previous = baseline.get('results', {}).get(book, {}).get(stage)
+            if not previous or not previous.get('ok', True) or not record['ok']:
+                continue
+            before, after = previous['seconds'], record['seconds']
+            change = 100.0 * (after - before) / before if before else 0.0
+            if change > threshold and after - before > min_delta:
+                regressions.append((book, stage, before, after, change))
+    return regressions
+
+def find_over_budget(results, budgets=BUDGETS):
+    """Return (book, stage, seconds, budget) for stages slower than their absolute budget."""
+    return [
+        (book, stage, record['seconds'], budgets[stage])
+        for book, stages in results.items()
+        for stage, record in stages.items()
+        if stage in budgets and record['ok'] and record['seconds'] > budgets[stage]
+    ]
+
+def main():
+    """Main function."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark the book pipeline stages and detect regressions')
+    parser.add_argument('--stages', default=','.join(STAGES), help=f"Comma-separated stages (default: {','.join(STAGES)})")
+    parser.add_argument('--books', default=','.join(BOOKS), help='Comma-separated books: real, synthetic (default: both)')
+    parser.add_argument('--scale', type=int, default=DEFAULT_SCALE, help='Chapter replication factor of the synthetic book (default: 10)')
+    parser.add_argument('--repeat', type=int, default=1, help='Runs per stage; the fastest is compared (default: 1)')
+    parser.add_argument('--jobs', '-j', type=int, default=1, help='--jobs passed to the execute and generate_plots stages (default: 1)')
+    parser.add_argument('--output', default=str(DEFAULT_RESULTS), help='Results file (default: benchmark_results.json)')
+    parser.add_argument('--baseline', default=str(DEFAULT_BASELINE), help='Baseline to compare against (default: benchmark_baseline.json)')
+    parser.add_argument('--save-baseline', action='store_true', help='Also store these results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help='Allowed slowdown in percent before a stage counts as regressed (default: 20)')
+    parser.add_argument('--min-delta', type=float, default=DEFAULT_MIN_DELTA, help='Ignore slowdowns smaller than this many seconds (default: 0.25)')
+
+    args = parser.parse_args()
+
+    stages = [stage.strip() for stage in args.stages.split(',') if stage.strip()]
+    books = [book.strip() for book in args.books.split(',') if book.strip()]
+    unknown = [stage for stage in stages if stage not in STAGES] + [book for book in books if book not in BOOKS]
+    if unknown:
+        print(f"❌ Unknown stage or book: {', '.join(unknown)}")
+        return 2
+
+    print("=" * 60)
+    print("Book Pipeline Benchmark")
+    print("=" * 60)
+    print()
+
+    results = run_benchmarks(stages, books, max(1, args.scale), max(1, args.repeat), args.jobs)
+    data = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'environment': environment_info(),
+        'scale': args.scale,
+        'results': results,
+    }
+    output_path = Path(args.output)
+    save_results(output_path, data)
+    print()
+    print(f"📊 Results written to {output_path}")
+
+    failed = [(book, stage) for book, records in results.items() for stage, record in records.items() if not record['ok']]
+    baseline_path = Path(args.baseline)
+    baseline = load_results(baseline_path)
+    regressions = []
+    if baseline is None:
+        print(f"ℹ️  No baseline at {baseline_path}; run with --save-baseline to create one")
+    else:
+        if baseline.get('environment') != data['environment']:
+            print("⚠️  Baseline was recorded on a different machine or Python; timings may not be comparable")
+        regressions = find_regressions(results, baseline, args.threshold, args.min_delta)
+        for book, stage, before, after, change in regressions:
+            print(f"  ❌ {book} {stage}: {before:.2f}s → {after:.2f}s (+{change:.1f}%)")
+    over_budget = find_over_budget(results)
+    for book, stage, seconds, budget in over_budget:
+        print(f"  ❌ {book} {stage}: {seconds:.2f}s, over its {budget:.2f}s budget")
+    if args.save_baseline:
+        save_results(baseline_path, data)
+        print(f"💾 Baseline saved to {baseline_path}")
+
+    print()
+    print("=" * 60)
+    if failed:
+        print(f"❌ {len(failed)} stage(s) failed: {', '.join(f'{book}/{stage}' for book, stage in failed)}")
+    elif regressions or over_budget:
+        if regressions:
+            print(f"❌ {len(regressions)} stage(s) regressed by more than {args.threshold:.0f}%")
+        if over_budget:
+            print(f"❌ {len(over_budget)} stage(s) over their time budget")
+    else:
+        print("✨ No regressions")
+    print("=" * 60)
+
+    return 1 if failed or regressions or over_budget else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""
+Static read/write analysis of a chapter's code blocks.
+
+analyze_block() uses `ast` to find the global names a block defines, the
+names it reads and the modules it imports. build_dependency_graph() turns
+that into a DAG: block j depends on every earlier block that writes a name
+j reads. The executor uses the graph to re-execute only changed blocks, the
+blocks they need, and their transitive dependents.
+
+Global names used inside a function body are resolved when it is called, so
+they are recorded per function (methods under their class) and charged to
+the blocks that call or otherwise reference the function, not to the block
+that defines it.
+
+The analysis is conservative: mutating a name (x.append(...), x[0] = ...,
+x.attr = ...) counts as writing it, so does passing it to a call that may
+change its arguments in place (np.random.shuffle(x), a user function; see
+_writes_arguments), draws from the global NumPy/Python
+random generators read and write a shared random-state pseudo-name, and
+blocks that can't be analyzed (syntax errors, star imports, exec/globals())
+depend on every earlier block and every later block depends on them.
+"""
+
+import ast
+import builtins
+
+RANDOM_STATE = '<random state>'
+BUILTIN_NAMES = set(dir(builtins))
+
+# Names preloaded in every file's namespace; calling their methods is not a mutation
+PRELOADED_MODULES = {'np', 'pd', 'plt', 'stats', 'Counter'}
+
+# Attribute access that consumes the global random state (any attribute of
+# np.random/random counts too, e.g. random.choice)
+RANDOM_ATTRIBUTES = {'random', 'rvs'}
+# Methods that draw from the global NumPy state unless given random_state,
+# e.g. DataFrame.sample
+RANDOM_METHODS = {'sample'}
+SEED_FUNCTIONS = {'seed'}
+# Library functions that change an argument in place (np.random.shuffle,
+# random.shuffle, np.fill_diagonal, ...); other calls into modules are pure
+IN_PLACE_FUNCTIONS = {'shuffle', 'fill_diagonal', 'copyto', 'put', 'place', 'putmask', 'put_along_axis'}
+# Builtins that change an argument: setattr(obj, ...), next(iterator)
+MUTATING_BUILTINS = {'setattr', 'delattr', 'next'}
+OPAQUE_CALLS = {'exec', 'eval', 'globals', 'locals', 'vars', '__import__'}
+
+class _BlockVisitor(ast.NodeVisitor):
+    """Collect module-level writes and reads of a block, and the call-time ones of its functions."""
+
+    def __init__(self):
+        self.defines = set()
+        self.reads = set()
+        self.imports = set()
+        self.modules = set()
+        self.uses_random = False
+        self.seeds_random = False
+        self.opaque = False
+        self.scopes = []  # stack of (locals, declared globals) for functions
+        self.functions = {}  # function/class name -> {'reads', 'writes'} at call time
+        self.function = None  # record of the function body being visited
+        self.owner = None  # module-level class whose methods are being visited
+
+    def _read(self, name):
+        """Record a global read, deferred to call time inside a function body."""
+        if any(name in scope_locals for scope_locals, _ in self.scopes):
+            return
+        if self.function is not None:
+            self.function['reads'].add(name)
+        else:
+            self.reads.add(name)
+
+    def _write(self, name):
+        """Record a global write, deferred to call time inside a function body."""
+        if self.function is not None:
+            self.function['writes'].add(name)
+        else:
+            self.defines.add(name)
+
+    def _use_random(self, seeds=False):
+        if self.function is not None:
+            self.function['writes'].add(RANDOM_STATE)
+            if not seeds:
+                self.function['reads'].add(RANDOM_STATE)
+        elif seeds:
+            self.seeds_random = True
+        else:
+            self.uses_random = True
+
+    def _store(self, name):
+        if not self.scopes:
+            self.defines.add(name)
+        else:
+            scope_locals, scope_globals = self.scopes[-1]
+            if name in scope_globals:
+                self._write(name)
+            else:
+                scope_locals.add(name)
+
+    def _mutate(self, node):
+        """Record the base name of an attribute/subscript target as written."""
+        while isinstance(node, (ast.Attribute, ast.Subscript)):
+            node = node.value
+        if isinstance(node, ast.Name):
+            self._read(node.id)
+            if node.id in self.modules or node.id in PRELOADED_MODULES:
+                return
+            if any(node.id in scope_locals for scope_locals, _ in self.scopes):
+                return
+            if self.scopes:
+                # Mutating a global from a function body: x.append(...) needs no 'global x'
+                self._write(node.id)
+            else:
+                self.defines.add(node.id)
+
+    def visit_Name(self, node):
+        if isinstance(node.ctx, ast.Load):
+            self._read(node.id)
+        else:
+            self._store(node.id)
+
+    def visit_Import(self, node):
+        for alias in node.names:
+            name = alias.asname or alias.name.split('.')[0]
+            self.imports.add(alias.name)
+            self.modules.add(name)
+            self._store(name)
+
+    def visit_ImportFrom(self, node):
+        module = node.module or ''
+        self.imports.add(module)
+        for alias in node.names:
+            if alias.name == '*':
+                self.opaque = True
+                continue
+            self._store(alias.asname or alias.name)
+        if module.split('.')[0] == 'random' or module.startswith('numpy.random'):
+            self._use_random()
+
+    def visit_Global(self, node):
+        if self.scopes:
+            self.scopes[-1][1].update(node.names)
+
+    def _visit_function(self, node):
+        self._store(node.name)
+        for decorator in node.decorator_list:
+            self.visit(decorator)
+        self.visit(node.args)
+        if getattr(node, 'returns', None) is not None:
+            self.visit(node.returns)
+        arguments = node.args
+        params = {
+            arg.arg for arg in arguments.posonlyargs + arguments.args + arguments.kwonlyargs
+        }
+        if arguments.vararg:
+            params.add(arguments.vararg.arg)
+        if arguments.kwarg:
+            params.add(arguments.kwarg.arg)
+        outer = self.function
+        if outer is None:
+            # Nested functions and methods share the record of the outermost definition
+            self.function = self.functions.setdefault(
+                self.owner or node.name, {'reads': set(), 'writes': set()}
+            )
+        self.scopes.append((params, set()))
+        body = node.body if isinstance(node.body, list) else [node.body]
+        for statement in body:
+            self.visit(statement)
+        self.scopes.pop()
+        self.function = outer
+
+    visit_FunctionDef = _visit_function
+    visit_AsyncFunctionDef = _visit_function
+
+    def visit_Lambda(self, node, name=None):
+        self.visit(node.args)
+        params = {arg.arg for arg in node.args.args + node.args.kwonlyargs}
+        outer = self.function
+        if outer is None and name is not None:
+            # f = lambda ...: the body runs when f is called, like a def
+            self.function = self.functions.setdefault(name, {'reads': set(), 'writes': set()})
+        self.scopes.append((params, set()))
+        self.visit(node.body)
+        self.scopes.pop()
+        self.function = outer
+
+    def _visit_comprehension(self, node):
+        # Comprehension targets are local to the comprehension
+        self.scopes.append((set(), set()))
+        for generator in node.generators:
+            self.visit(generator.iter)
+            self.visit(generator.target)
+            for condition in generator.ifs:
+                self.visit(condition)
+        for field in ('elt', 'key', 'value'):
+            if hasattr(node, field):
+                self.visit(getattr(node, field))
+        self.scopes.pop()
+
+    visit_ListComp = _visit_comprehension
+    visit_SetComp = _visit_comprehension
+    visit_DictComp = _visit_comprehension
+    visit_GeneratorExp = _visit_comprehension
+
+    def visit_ClassDef(self, node):
+        self._store(node.name)
+        for expression in node.bases + node.keywords + node.decorator_list:
+            self.visit(expression)
+        outer = self.owner
+        if self.function is None and outer is None:
+            # Methods run when the class is used: charge them to the class name
+            self.owner = node.name
+        self.scopes.append((set(), set()))
+        for statement in node.body:
+            self.visit(statement)
+        self.scopes.pop()
+        self.owner = outer
+
+    def visit_Assign(self, node):
+        for target in node.targets:
+            self._visit_target(target)
+        target = node.targets[0]
+        if (not self.scopes and len(node.targets) == 1 and isinstance(target, ast.Name)
+                and isinstance(node.value, ast.Lambda)):
+            self.visit_Lambda(node.value, name=target.id)
+        else:
+            self.visit(node.value)
+
+    def visit_AugAssign(self, node):
+        if isinstance(node.target, ast.Name):
+            self._read(node.target.id)
+        self._visit_target(node.target)
+        self.visit(node.value)
+
+    def visit_AnnAssign(self, node):
+        self._visit_target(node.target)
+        if node.value is not None:
+            self.visit(node.value)
+
+    def visit_Delete(self, node):
+        for target in node.targets:
+            self._visit_target(target)
+
+    def _visit_target(self, target):
+        if isinstance(target, (ast.Attribute, ast.Subscript)):
+            self._mutate(target)
+            self.visit(target)
+        else:
+            self.visit(target)
+
+    def visit_Attribute(self, node):
+        if node.attr in RANDOM_ATTRIBUTES or _mentions_random(node.value):
+            self._use_random()
+        self.generic_visit(node)
+
+    def visit_Call(self, node):
+        func = node.func
+        if isinstance(func, ast.Name) and func.id in OPAQUE_CALLS:
+            self.opaque = True
+        if isinstance(func, ast.Attribute):
+            if func.attr in SEED_FUNCTIONS and _mentions_random(func.value):
+                self._use_random(seeds=True)
+            elif func.attr in RANDOM_METHODS and not any(
+                keyword.arg == 'random_state' for keyword in node.keywords
+            ):
+                self._use_random()
+            # A method call may mutate its receiver
+            self._mutate(func.value)
+        if self._writes_arguments(func):
+            for argument in node.args + [keyword.value for keyword in node.keywords]:
+                if isinstance(argument, ast.Starred):
+                    argument = argument.value
+                if isinstance(argument, ast.Name):
+                    self._mutate(argument)
+        self.generic_visit(node)
+
+    def _writes_arguments(self, func):
+        """Whether a call may change the objects passed to it.
+
+        Functions called by name (user functions, from-imports) may, except
+        pure builtins. Module functions only do if they are known in-place
+        ones. Methods of other objects are taken to change only their
+        receiver, as in the pandas/matplotlib/list methods the book calls.
+        """
+        if isinstance(func, ast.Name):
+            return func.id in MUTATING_BUILTINS or func.id in IN_PLACE_FUNCTIONS or func.id not in BUILTIN_NAMES
+        if isinstance(func, ast.Attribute):
+            return func.attr in IN_PLACE_FUNCTIONS
+        return True
+
+def _mentions_random(node):
+    """Check whether an expression is np.random, random, etc."""
+    while isinstance(node, ast.Attribute):
+        if node.attr == 'random':
+            return True
+        node = node.value
+    return isinstance(node, ast.Name) and node.id == 'random'
+
+def analyze_block(code):
+    """Statically analyze one block.
+
+    Returns a dict with 'defines', 'reads' and 'imports' (sets of names),
+    'functions' (for each function or class it defines, the global names
+    read and written when it is called) and 'opaque' (True if the block
+    can't be analyzed reliably).
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return {'defines': set(), 'reads': set(), 'imports': set(), 'functions': {}, 'opaque': True}
+
+    visitor = _BlockVisitor()
+    visitor.visit(tree)
+    reads = visitor.reads - BUILTIN_NAMES
+    defines = set(visitor.defines)
+    if visitor.uses_random or visitor.seeds_random:
+        defines.add(RANDOM_STATE)
+        if not visitor.seeds_random:
+            reads.add(RANDOM_STATE)
+    functions = {
+        name: {'reads': record['reads'] - BUILTIN_NAMES, 'writes': record['writes']}
+        for name, record in visitor.functions.items()
+    }
+    return {
+        'defines': defines,
+        'reads': reads,
+        'imports': visitor.imports,
+        'functions': functions,
+        'opaque': visitor.opaque,
+    }
+
+def _call_effects(names, functions):
+    """Global reads and writes of calling the functions among names, transitively."""
+    reads, writes = set(), set()
+    seen = set()
+    stack = [name for name in names if name in functions]
+    while stack:
+        name = stack.pop()
+        if name in seen:
+            continue
+        seen.add(name)
+        record = functions[name]
+        reads |= record['reads']
+        writes |= record['writes']
+        stack.extend(callee for callee in record['reads'] if callee in functions)
+    return reads, writes
+
+def build_dependency_graph(codes):
+    """Build the dependency DAG of a file's blocks.
+
+    Returns a list with, for each block, the sorted indices of the earlier
+    blocks it directly depends on.
+    """
+    analyses = [analyze_block(code) for code in codes]
+    writers = {}  # name -> indices of blocks writing it so far
+    functions = {}  # function name -> call-time reads/writes of its latest definition
+    last_opaque = None
+    graph = []
+    for j, analysis in enumerate(analyses):
+        # Functions defined here may be called here too
+        for name in analysis['defines']:
+            functions.pop(name, None)
+        functions.update(analysis['functions'])
+        # Using a function (calling it or passing it on) reads what its body reads
+        call_reads, call_writes = _call_effects(analysis['reads'], functions)
+        reads = analysis['reads'] | call_reads
+        if analysis['opaque']:
+            deps = set(range(j))
+            last_opaque = j
+        else:
+            deps = set()
+            for name in reads:
+                deps.update(writers.get(name, ()))
+            if last_opaque is not None:
+                deps.add(last_opaque)
+        graph.append(sorted(deps))
+        for name in analysis['defines'] | call_writes:
+            writers.setdefault(name, []).append(j)
+        if analysis['opaque']:
+            # Anything may have been written: later reads of any name see it
+            for indices in writers.values():
+                if j not in indices:
+                    indices.append(j)
+    return graph
+
+def ancestors(graph, indices):
+    """Return the given block indices plus everything they transitively depend on.
+
+    indices is an iterable of block indices (e.g. a set), not a single index.
+    """
+    result = set()
+    stack = list(indices)
+    while stack:
+        i = stack.pop()
+        if i in result:
+            continue
+        result.add(i)
+        stack.extend(graph[i])
+    return result
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Run the chapter clean-up and execution scripts as one pipeline.
+
+Instead of running remove_all_outputs.py, remove_errors.py, fix_latex.py
+and execute_and_add_outputs.py one after another, each re-reading,
+re-parsing and rewriting every file, book_pipeline.py reads each file once
+into a Document, runs the selected stages on it in memory, and writes it
+back at most once (and only if it changed). The markdown index is reused
+between stages until one of them edits the text. Files are processed in
+parallel with --jobs.
+
+Usage:
+    python scripts/book_pipeline.py                                  # whole book, default stages
+    python scripts/book_pipeline.py --stages fix_latex part3/*.md
+    python scripts/book_pipeline.py --stages remove_errors,execute --jobs 4
+"""
+
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from markdown_blocks import index_markdown, apply_edits
+from remove_all_outputs import remove_all_outputs
+from remove_errors import remove_error_outputs
+from fix_latex import latex_fixes
+from book_schedule import DEFAULT_TOC, toc_files
+from safe_write import write_text
+
+DEFAULT_STAGES = ['remove_outputs', 'remove_errors', 'fix_latex', 'execute']
+
+class Document:
+    """A chapter held in memory while the stages run.
+
+    The markdown index is built on demand and kept until a stage changes
+    the text, so stages that make no edits don't cause a re-parse.
+    """
+
+    def __init__(self, path, text):
+        self.path = path
+        self.original = text
+        self._text = text
+        self._index = None
+
+    @property
+    def text(self):
+        return self._text
+
+    @text.setter
+    def text(self, value):
+        if value != self._text:
+            self._text = value
+            self._index = None
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = index_markdown(self._text)
+        return self._index
+
+    @property
+    def changed(self):
+        return self._text != self.original
+
+def stage_remove_outputs(document, options):
+    """Remove every output section."""
+    document.text, count = remove_all_outputs(document.text, document.index)
+    return count
+
+def stage_remove_errors(document, options):
+    """Remove output sections that contain errors."""
+    document.text, count = remove_error_outputs(document.text, document.index)
+    return count
+
+def stage_fix_latex(document, options):
+    """Turn \\[ \\] display math delimiters into $$."""
+    edits = latex_fixes(document.text, document.index)
+    document.text = apply_edits(document.text, edits)
+    return len(edits)
+
+def stage_execute(document, options):
+    """Execute the Python blocks and insert the missing outputs."""
+    # Imported here: only this stage needs numpy/pandas/matplotlib
+    from execute_and_add_outputs import add_outputs_to_markdown
+    document.text, count = add_outputs_to_markdown(
+        document.text, document.path, options['cache_dir'], limits=options['limits'],
+        dependencies=options['dependencies'], index=document.index,
+    )
+    return count
+
+STAGES = {
+    'remove_outputs': stage_remove_outputs,
+    'remove_errors': stage_remove_errors,
+    'fix_latex': stage_fix_latex,
+    'execute': stage_execute,
+}
+
+def run_pipeline(filepath, stages, options):
+    """Read a file once, run the stages in order and write it back if it changed.
+
+    Returns a dict with the success flag, the log lines, the per-stage
+    (changes, seconds) and whether the file was written.
+    """
+    lines = [f"Processing: {filepath}"]
+    timings = {}
+    try:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            document = Document(filepath, f.read())
+    except Exception as e:
+        lines.append(f"  ❌ Error reading file: {e}")
+        return {'ok': False, 'log': lines, 'stages': timings, 'written': False}
+
+    for name in stages:
+        start = time.perf_counter()
+        try:
+            count = STAGES[name](document, options)
+        except Exception as e:
+            lines.append(f"  ❌ {name}: {type(e).__name__}: {e}")
+            return {'ok': False, 'log': lines, 'stages': timings, 'written': False}
+        timings[name] = (count, time.perf_counter() - start)
+        if count:
+            lines.append(f"  ✅ {name}: {count} change(s)")
+
+    written = False
+    if document.changed:
+        try:
+            written = write_text(filepath, document.text)
+        except Exception as e:
+            lines.append(f"  ❌ Error writing file: {e}")
+            return {'ok': False, 'log': lines, 'stages': timings, 'written': False}
+    if not written:
+        lines.append("  ℹ️  Unchanged")
+    return {'ok': True, 'log': lines, 'stages': timings, 'written': written}
+
+def main():
+    """Main function."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Run the chapter clean-up and execution stages in one pass per file')
+    parser.add_argument('files', nargs='*', help='Markdown files to process (default: every page in _toc.yml)')
+    parser.add_argument('--stages', default=','.join(DEFAULT_STAGES), help=f"Comma-separated stages, run in the given order; available: {', '.join(STAGES)} (default: {','.join(DEFAULT_STAGES)})")
+    parser.add_argument('--jobs', '-j', type=int, default=1, help='Number of files to process in parallel (default: 1)')
+    parser.add_argument('--toc', default=str(DEFAULT_TOC), help='Table of contents listing the default files (default: _toc.yml)')
+    parser.add_argument('--cache-dir', default='.execute_cache', help='Block output cache of the execute stage (default: .execute_cache)')
+    parser.add_argument('--no-cache', action='store_true', help='Re-execute every block in the execute stage')
+    parser.add_argument('--deps', action='store_true', help='Plan the execute stage with the block dependency graph')
+    parser.add_argument('--timeout', type=int, default=None, help='Per-block wall-clock limit in seconds for the execute stage, 0 to disable (default: execute.timeout from _config.yml)')
+    parser.add_argument('--max-memory', type=int, default=0, help='Per-block resident memory limit in MB for the execute stage, 0 to disable (default: 0)')
+
+    args = parser.parse_args()
+
+    stages = [name.strip() for name in args.stages.split(',') if name.strip()]
+    unknown = [name for name in stages if name not in STAGES]
+    if unknown or not stages:
+        print(f"❌ Unknown stage(s): {', '.join(unknown) or '(none given)'}; available: {', '.join(STAGES)}")
+        return 2
+
+    if args.files:
+        files = [Path(f) for f in args.files]
+    else:
+        files = toc_files(Path(args.toc)) or []
+    existing_files = []
+    for filepath in files:
+        if not filepath.exists():
+            print(f"⚠️  File not found: {filepath}")
+            continue
+        existing_files.append(filepath)
+    if not existing_files:
+        print("No files to process!")
+        return 1
+
+    options = {'cache_dir': None, 'limits': None, 'dependencies': False}
+    if 'execute' in stages:
+        from execute_and_add_outputs import book_timeout
+        options = {
+            'cache_dir': None if args.no_cache else Path(args.cache_dir),
+            'limits': {
+                'timeout': book_timeout() if args.timeout is None else args.timeout,
+                'max_memory': args.max_memory,
+            },
+            'dependencies': args.deps and not args.no_cache,
+        }
+
+    print("=" * 60)
+    print("Book Pipeline")
+    print("=" * 60)
+    print(f"Stages: {' → '.join(stages)}")
+    print()
+
+    start = time.perf_counter()
+    if args.jobs > 1 and len(existing_files) > 1:
+        # Files are independent; logs are printed in input order
+        with ProcessPoolExecutor(max_workers=min(args.jobs, len(existing_files))) as pool:
+            results = list(pool.map(run_pipeline, existing_files, [stages] * len(existing_files),
+                                    [options] * len(existing_files)))
+    else:
+        results = [run_pipeline(filepath, stages, options) for filepath in existing_files]
+    elapsed = time.perf_counter() - start
+
+    for result in results:
+        for line in result['log']:
+            print(line)
+    print()
+
+    print("Stage totals:")
+    for name in stages:
+        records = [result['stages'][name] for result in results if name in result['stages']]
+        changes = sum(count for count, _ in records)
+        seconds = sum(seconds for _, seconds in records)
+        print(f"  {name:<15} {changes:>5} change(s) {seconds:8.2f}s")
+    print()
+
+    success_count = sum(result['ok'] for result in results)
+    written = sum(result['written'] for result in results)
+    print("=" * 60)
+    print(f"✨ Processed {success_count}/{len(existing_files)} files in {elapsed:.2f}s, {written} written")
+    print("=" * 60)
+
+    return 0 if success_count == len(existing_files) else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
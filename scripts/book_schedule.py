@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Chapter discovery and cost-ordered scheduling for book execution.
+
+toc_files() lists the book's pages in reading order from _toc.yml.
+schedule() orders files longest-first by their last recorded execution
+time (the executor's manifest) and simulates handing them to a pool of
+workers, which is how ProcessPoolExecutor consumes submitted tasks. The
+longest-processing-time-first order keeps one slow chapter from starting
+last and dominating the wall time of a parallel run.
+"""
+
+from pathlib import Path
+
+DEFAULT_TOC = Path('_toc.yml')
+DEFAULT_BLOCK_ESTIMATE = 0.5  # seconds per code block when no file has history
+SOURCE_SUFFIXES = ('.md', '.ipynb')
+
+def _toc_entries(node):
+    """Yield every 'file' entry of a _toc.yml node in order."""
+    if isinstance(node, list):
+        for item in node:
+            yield from _toc_entries(item)
+    elif isinstance(node, dict):
+        for key in ('root', 'file'):
+            if isinstance(node.get(key), str):
+                yield node[key]
+        for key in ('parts', 'chapters', 'sections'):
+            if key in node:
+                yield from _toc_entries(node[key])
+
+def toc_files(toc_path=DEFAULT_TOC):
+    """Return the existing markdown files listed in _toc.yml, in book order.
+
+    Returns None if the TOC is missing or can't be parsed.
+    """
+    toc_path = Path(toc_path)
+    try:
+        import yaml
+        with open(toc_path, 'r', encoding='utf-8') as f:
+            toc = yaml.safe_load(f)
+    except Exception:
+        # Missing file, PyYAML not installed or malformed YAML
+        return None
+
+    root = toc_path.parent
+    files = []
+    for entry in _toc_entries(toc):
+        candidates = [root / entry] if Path(entry).suffix in SOURCE_SUFFIXES else [
+            root / f"{entry}{suffix}" for suffix in SOURCE_SUFFIXES
+        ]
+        for candidate in candidates:
+            if candidate.suffix == '.md' and candidate.exists() and candidate not in files:
+                files.append(candidate)
+                break
+    return files
+
+def historical_durations(files, manifest):
+    """Return each file's last recorded duration in seconds (None if unknown)."""
+    durations = {}
+    for filepath in files:
+        entry = (manifest or {}).get(Path(filepath).as_posix()) or {}
+        duration = entry.get('duration')
+        durations[filepath] = float(duration) if isinstance(duration, (int, float)) else None
+    return durations
+
+def estimate_durations(durations, block_counts):
+    """Fill unknown durations from the file's number of code blocks.
+
+    Each block is assumed to take the mean per-block time of the files with
+    history, so a page without code is estimated at zero.
+    """
+    known = [filepath for filepath, value in durations.items() if value is not None]
+    known_blocks = sum(block_counts[filepath] for filepath in known)
+    per_block = (sum(durations[filepath] for filepath in known) / known_blocks if known_blocks
+                 else DEFAULT_BLOCK_ESTIMATE)
+    return {
+        filepath: per_block * block_counts[filepath] if value is None else value
+        for filepath, value in durations.items()
+    }
+
+def schedule(files, estimates, workers):
+    """Order files longest-first and simulate a pool of workers.
+
+    Returns a dict with 'order' (files in submission order), 'worker' (the
+    worker each file is expected to run on), 'estimates', 'makespan'
+    (expected wall time) and 'serial' (sum of all estimates).
+    """
+    # Stable sort: equal estimates keep their book order
+    order = sorted(files, key=lambda filepath: -estimates[filepath])
+    loads = [0.0] * max(1, workers)
+    assigned = {}
+    for filepath in order:
+        # A free worker takes the next task: the least loaded one
+        worker = min(range(len(loads)), key=lambda i: loads[i])
+        assigned[filepath] = worker
+        loads[worker] += estimates[filepath]
+    return {
+        'order': order,
+        'worker': assigned,
+        'estimates': estimates,
+        'makespan': max(loads),
+        'serial': sum(estimates[filepath] for filepath in files),
+    }
@@ -10,29 +10,442 @@ import contextlib
 from pathlib import Path
 import warnings
 import hashlib
+import json
+import shutil
+import platform
+import time
+import multiprocessing
+import tracemalloc
+import csv
+import os
+import difflib
+import tempfile
+import uuid
+from datetime import datetime
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import matplotlib
 matplotlib.use('Agg')  # Non-interactive backend
 import matplotlib.pyplot as plt
+from markdown_blocks import index_markdown, python_blocks, apply_edits
+from namespace_snapshots import save_namespace, restore_namespace, has_snapshot, prune_snapshots, HAS_DILL
+from block_dependencies import build_dependency_graph, ancestors
+from image_optimizer import ImageOptimizer, format_stats
+from safe_write import write_bytes, write_text
+from book_schedule import DEFAULT_TOC, toc_files, historical_durations, estimate_durations, schedule
+from notebook_export import (
+    DEFAULT_NOTEBOOK_DIR, DEFAULT_JUPYTER_CACHE, NOTEBOOK_FORMATS, notebook_path, export_notebook, write_build_config,
+)
+
+# On-disk cache of block outputs, keyed by the chained hash of the code
+DEFAULT_CACHE_DIR = Path('.execute_cache')
+CACHE_FORMAT_VERSION = 2
+
+# Manifest of per-file code fingerprints used by --incremental
+DEFAULT_MANIFEST = DEFAULT_CACHE_DIR / 'manifest.json'
+
+# Per-block profile report written by --profile
+DEFAULT_PROFILE_REPORT = Path('execute_profile.json')
+PROFILE_FIELDS = [
+    'file', 'block', 'line', 'mode', 'wall_time', 'cpu_time',
+    'peak_memory', 'figures', 'figure_bytes', 'savefig_time',
+]
+
+# Per-block resource limits; the timeout default comes from _config.yml
+BOOK_CONFIG = Path('_config.yml')
+FALLBACK_TIMEOUT = 300
+SUPERVISOR_POLL_INTERVAL = 0.1
+
+# Drift report written by --check; images match when their perceptual
+# hashes differ in at most IMAGE_HASH_THRESHOLD of IMAGE_HASH_SIZE**2 bits
+DEFAULT_CHECK_REPORT = Path('execute_check.json')
+IMAGE_HASH_SIZE = 16
+IMAGE_HASH_THRESHOLD = 12
+
+# Block output kept inline; longer output is truncated to its head and tail
+# and the full text spills to images/output_<hash>.txt
+DEFAULT_MAX_OUTPUT_BYTES = 10000
+
+# Plots are rasterized on the executing thread and PNG-encoded by a small
+# thread pool while the next block runs
+FIGURE_DPI = 100
+FIGURE_WRITER_THREADS = 2
+
+# --watch polls the files' modification times
+WATCH_INTERVAL = 0.5
+
+# Libraries imported once by the warm fork server instead of once per file
+PRELOAD_MODULES = ['numpy', 'pandas', 'scipy.stats', 'matplotlib.pyplot']
 
 def extract_code_blocks(markdown_text):
-    """Extract all Python code blocks from markdown."""
-    pattern = r'```python\n(.*?)```'
-    matches = re.finditer(pattern, markdown_text, re.DOTALL)
-    blocks = []
-    for match in matches:
-        blocks.append({
-            'code': match.group(1),
-            'start': match.start(),
-            'end': match.end(),
-            'full_match': match.group(0)
-        })
-    return blocks
-
-def execute_code_with_context(code, exec_globals, code_hash, images_dir):
-    """Execute Python code with persistent context and capture output."""
-    # Create string buffers to capture stdout/stderr
-    stdout_buffer = io.StringIO()
-    stderr_buffer = io.StringIO()
+    """Extract all Python code blocks (with their attached outputs) from markdown."""
+    return python_blocks(index_markdown(markdown_text))
+
+@lru_cache(maxsize=None)
+def environment_fingerprint():
+    """Describe the interpreter and library versions that affect block outputs."""
+    parts = [f"cache={CACHE_FORMAT_VERSION}", f"python={platform.python_version()}"]
+    for name in ['numpy', 'pandas', 'scipy', 'matplotlib']:
+        try:
+            module = __import__(name)
+            parts.append(f"{name}={module.__version__}")
+        except ImportError:
+            parts.append(f"{name}=missing")
+    return ';'.join(parts)
+
+def chain_block_hashes(blocks, filepath):
+    """Hash each block together with every block before it.
+
+    The key of block i changes whenever block i or any earlier block changes,
+    so a cached result is only reused when the whole prefix is identical.
+    """
+    previous = hashlib.sha256(f"{environment_fingerprint()}|{filepath.as_posix()}".encode()).hexdigest()
+    keys = []
+    for block in blocks:
+        previous = hashlib.sha256(f"{previous}|{block['code']}".encode()).hexdigest()
+        keys.append(previous)
+    return keys
+
+def dependency_block_hashes(blocks, graph, filepath):
+    """Hash each block together with the keys of the blocks it depends on.
+
+    Unlike chain_block_hashes, the key of block i only changes when block i
+    or one of its (transitive) dependencies in the graph changes.
+    """
+    seed = hashlib.sha256(f"deps|{environment_fingerprint()}|{filepath.as_posix()}".encode()).hexdigest()
+    keys = []
+    for block, deps in zip(blocks, graph):
+        parts = [seed, block['code']] + [keys[dep] for dep in deps]
+        keys.append(hashlib.sha256('|'.join(parts).encode()).hexdigest())
+    return keys
+
+def code_fingerprint(blocks):
+    """Hash only the code of a file's blocks, so prose edits don't change it."""
+    digest = hashlib.sha256(environment_fingerprint().encode())
+    for block in blocks:
+        digest.update(b'\0' + block['code'].encode())
+    return digest.hexdigest()
+
+def referenced_images(markdown_text):
+    """Return the sorted plot images referenced by output sections."""
+    images = set()
+    for output in index_markdown(markdown_text)['outputs']:
+        images.update(path[len('images/'):] for path in output['images'] if path.startswith('images/'))
+    return sorted(images)
+
+def load_manifest(manifest_path):
+    """Load the build manifest (empty if missing or unreadable)."""
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_manifest(manifest_path, manifest):
+    """Write the build manifest with stable key order."""
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    write_text(manifest_path, json.dumps(manifest, indent=2, sort_keys=True) + '\n')
+
+def is_up_to_date(entry, markdown_text, filepath):
+    """Check whether a file can be skipped according to its manifest entry.
+    
+    The file is up to date if its code fingerprint is unchanged, every block
+    still has an output section and every referenced image still exists.
+    """
+    if not entry:
+        return False
+    blocks = extract_code_blocks(markdown_text)
+    if entry.get('fingerprint') != code_fingerprint(blocks):
+        return False
+    if not all(block['output'] is not None for block in blocks):
+        return False
+    images_dir = filepath.parent / 'images'
+    return all((images_dir / name).exists() for name in entry.get('images', []))
+
+def can_skip(filepath, markdown_text, manifest, notebooks=None):
+    """Check whether --incremental may skip a file (see is_up_to_date).
+    
+    A requested notebook that doesn't exist yet forces a run.
+    """
+    if notebooks is not None and not notebook_path(notebooks['dir'], filepath, notebooks['format']).exists():
+        return False
+    return is_up_to_date(manifest.get(filepath.as_posix()), markdown_text, filepath)
+
+def load_cached_block(cache_dir, key, images_dir):
+    """Return the cached (output_text, plot_path, spill_path) for a block, or None on a miss.
+    
+    Artifacts missing from images_dir are restored there from the cache. With
+    images_dir None (the block's output section is kept), the paths point at
+    the cached copies and nothing is written to the book.
+    """
+    entry_path = cache_dir / f"{key}.json"
+    if not entry_path.exists():
+        return None
+    try:
+        with open(entry_path, 'r', encoding='utf-8') as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    
+    artifacts = []
+    for field, suffix in [('plot', 'png'), ('spill', 'txt')]:
+        if not entry.get(field):
+            artifacts.append(None)
+            continue
+        cached_artifact = cache_dir / f"{key}.{suffix}"
+        if images_dir is None:
+            if not cached_artifact.exists():
+                return None
+            artifacts.append(cached_artifact)
+            continue
+        artifact_path = images_dir / entry[field]
+        if not artifact_path.exists():
+            # Restore the artifact if it was deleted from the book
+            if not cached_artifact.exists():
+                return None
+            shutil.copyfile(cached_artifact, artifact_path)
+        artifacts.append(artifact_path)
+    
+    plot_path, spill_path = artifacts
+    return entry['output'], plot_path, spill_path
+
+def store_cached_block(cache_dir, key, output_text, plot_path, spill_path=None):
+    """Save a block's output text, plot and spill file under its cache key."""
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    if plot_path:
+        shutil.copyfile(plot_path, cache_dir / f"{key}.png")
+    if spill_path:
+        shutil.copyfile(spill_path, cache_dir / f"{key}.txt")
+    entry = {
+        'output': output_text,
+        'plot': plot_path.name if plot_path else None,
+        'spill': spill_path.name if spill_path else None,
+    }
+    write_text(cache_dir / f"{key}.json", json.dumps(entry))
+
+class BoundedOutput(io.TextIOBase):
+    """Text stream that keeps at most max_bytes of output in memory.
+    
+    Output up to max_bytes is kept whole. Past that, only the first and last
+    max_bytes // 2 bytes are retained for a preview, and the complete output
+    is streamed to a temporary file in spill_dir (when given) as it is
+    written, so memory stays flat however much a block prints. close() names
+    that file output_<hash of its content>.txt, like plots, and sets
+    spill_path to it.
+    """
+    
+    def __init__(self, max_bytes, spill_dir=None):
+        self.max_bytes = max_bytes
+        self.head_limit = max_bytes // 2
+        self.tail_limit = max_bytes - self.head_limit
+        self.spill_dir = spill_dir
+        self.spill_path = None
+        self.spill = None
+        self.spill_tmp = None
+        self.digest = hashlib.sha256()
+        self.buffer = bytearray()
+        self.head = None
+        self.tail = None
+        self.total = 0
+    
+    def writable(self):
+        return True
+    
+    def write(self, text):
+        data = text.encode('utf-8', 'replace')
+        self.total += len(data)
+        if self.head is None:
+            self.buffer += data
+            if len(self.buffer) > self.max_bytes:
+                # Overflow: keep head and tail, stream everything to the spill file
+                if self.spill_dir is not None:
+                    self.spill_tmp = self.spill_dir / f".output_{uuid.uuid4().hex}.tmp"
+                    self.spill = open(self.spill_tmp, 'xb')
+                    self.spill.write(self.buffer)
+                    self.digest.update(self.buffer)
+                self.head = bytes(self.buffer[:self.head_limit])
+                self.tail = self.buffer[-self.tail_limit:]
+                self.buffer = None
+        else:
+            if self.spill is not None:
+                self.spill.write(data)
+                self.digest.update(data)
+            self.tail += data[-self.tail_limit:]
+            del self.tail[:-self.tail_limit]
+        return len(text)
+    
+    @property
+    def truncated(self):
+        return self.head is not None
+    
+    def getvalue(self):
+        """Return the output, or a head/tail preview if it overflowed."""
+        if not self.truncated:
+            return self.buffer.decode('utf-8', 'replace')
+        # Cut the preview at line boundaries where possible
+        head = self.head[:self.head.rfind(b'\n') + 1] or self.head
+        tail = self.tail[self.tail.find(b'\n') + 1:] or self.tail
+        omitted = self.total - len(head) - len(tail)
+        return (head.decode('utf-8', 'ignore')
+                + f"... [{omitted:,} bytes truncated] ...\n"
+                + tail.decode('utf-8', 'ignore'))
+    
+    def close(self):
+        """Close the stream and move the spill file (if any) to its content-hash name."""
+        if self.spill is not None:
+            self.spill.close()
+            self.spill = None
+            spill_path = self.spill_dir / f"output_{self.digest.hexdigest()[:12]}.txt"
+            if spill_path.exists():
+                # Same content, same name: keep the existing file (and its mtime)
+                self.spill_tmp.unlink()
+            else:
+                os.replace(self.spill_tmp, spill_path)
+            self.spill_path = spill_path
+        super().close()
+    
+    def discard(self):
+        """Close the stream and delete any partial spill file."""
+        if self.spill is not None:
+            self.spill.close()
+            self.spill = None
+            self.spill_tmp.unlink(missing_ok=True)
+        super().close()
+
+class _RasterBuffer(io.BytesIO):
+    """Binary buffer that remembers the (height, width, 4) shape Agg writes."""
+    
+    shape = None
+    
+    def write(self, data):
+        self.shape = getattr(data, 'shape', self.shape)
+        return super().write(data)
+
+def rasterize_figure(dpi=FIGURE_DPI):
+    """Render the current figure (tight bbox) to raw RGBA.
+    
+    Returns (rgba_bytes, (width, height)). If the backend doesn't report the
+    buffer shape, the figure is rendered to PNG and decoded instead.
+    """
+    buffer = _RasterBuffer()
+    plt.savefig(buffer, format='rgba', dpi=dpi, bbox_inches='tight')
+    data = buffer.getvalue()
+    if buffer.shape is not None and len(buffer.shape) == 3:
+        height, width = buffer.shape[:2]
+        if len(data) == width * height * 4:
+            return data, (width, height)
+    
+    from PIL import Image
+    
+    buffer = io.BytesIO()
+    plt.savefig(buffer, format='png', dpi=dpi, bbox_inches='tight')
+    buffer.seek(0)
+    with Image.open(buffer) as image:
+        image = image.convert('RGBA')
+        return image.tobytes(), image.size
+
+def figure_filename(raster):
+    """Name a plot by the hash of its pixels, so identical figures share a file."""
+    rgba, (width, height) = raster
+    digest = hashlib.sha256(f"{width}x{height}|".encode())
+    digest.update(rgba)
+    return f"output_{digest.hexdigest()[:12]}.png"
+
+def encode_png(plot_path, rgba, size, dpi=FIGURE_DPI):
+    """Write a raw RGBA buffer as a PNG, byte-identical to plt.savefig."""
+    from PIL import Image, PngImagePlugin
+    
+    image = Image.frombuffer('RGBA', size, rgba, 'raw', 'RGBA', 0, 1)
+    info = PngImagePlugin.PngInfo()
+    info.add_text('Software', f"Matplotlib version{matplotlib.__version__}, https://matplotlib.org/")
+    buffer = io.BytesIO()
+    image.save(buffer, format='png', dpi=(dpi, dpi), pnginfo=info)
+    # Content-named files are skipped once they exist, so never leave a partial one
+    write_bytes(plot_path, buffer.getvalue())
+
+class FigureWriter:
+    """Encode and write rasterized figures on background threads.
+    
+    PNG compression releases the GIL, so it overlaps with the next block.
+    With an optimizer (ImageOptimizer), each new PNG is also post-processed
+    on the same thread. flush() is the barrier to call before anything reads
+    the images.
+    """
+    
+    def __init__(self, threads=FIGURE_WRITER_THREADS, optimizer=None):
+        self.pool = ThreadPoolExecutor(max_workers=threads)
+        self.optimizer = optimizer
+        self.pending = []
+        self.submitted = set()
+    
+    def submit(self, plot_path, raster):
+        # Content-named: an existing file already holds exactly these pixels
+        if plot_path in self.submitted or plot_path.exists():
+            return
+        self.submitted.add(plot_path)
+        self.pending.append(self.pool.submit(self._write, plot_path, raster))
+    
+    def _write(self, plot_path, raster):
+        encode_png(plot_path, *raster)
+        if self.optimizer is not None:
+            self.optimizer.process(plot_path)
+    
+    def flush(self):
+        """Wait until every submitted figure is on disk."""
+        pending, self.pending = self.pending, []
+        for future in pending:
+            future.result()
+    
+    def close(self):
+        self.flush()
+        self.pool.shutdown()
+
+class _DeferredFigures:
+    """Figure writer stand-in that keeps rasters to hand back to the parent."""
+    
+    def __init__(self):
+        self.figures = []
+    
+    def submit(self, plot_path, raster):
+        self.figures.append((plot_path, raster))
+    
+    def take(self):
+        figures, self.figures = self.figures, []
+        return figures
+
+def _record_exec_metrics(metrics, wall_start, cpu_start):
+    """Store the elapsed wall/CPU time and tracemalloc peak of a block."""
+    metrics['wall_time'] = time.perf_counter() - wall_start
+    metrics['cpu_time'] = time.process_time() - cpu_start
+    if tracemalloc.is_tracing():
+        metrics['peak_memory'] = tracemalloc.get_traced_memory()[1]
+
+def execute_code_with_context(code, exec_globals, images_dir, metrics=None,
+                              max_output=DEFAULT_MAX_OUTPUT_BYTES, figure_writer=None):
+    """Execute Python code with persistent context and capture output.
+    
+    Returns (output_text, plot_path, spill_path). Plots are named by the hash
+    of their pixels, so identical figures share one file. If images_dir is
+    None the block is only replayed to rebuild context and any figure it
+    creates is discarded. Output longer than max_output bytes is truncated to
+    a preview, and the full text is written to images_dir/output_<content
+    hash>.txt (spill_path).
+    With a figure_writer, the plot is only rasterized here and encoded in
+    the background, so plot_path exists after figure_writer.flush(). If a
+    metrics dict is given, it is filled with wall/CPU time, tracemalloc peak
+    (when tracing), figure count and size (None while still being encoded),
+    and savefig (or rasterize) time.
+    """
+    if metrics is not None:
+        metrics.update({'figures': 0, 'figure_bytes': 0, 'savefig_time': 0.0, 'peak_memory': None})
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+
+    # Bounded buffers to capture stdout/stderr
+    stdout_buffer = BoundedOutput(max_output, images_dir)
+    stderr_buffer = BoundedOutput(max_output)
     
     plot_path = None
     
@@ -47,22 +460,38 @@ def execute_code_with_context(code, exec_globals, code_hash, images_dir):
                 # Execute the code with persistent globals
                 exec(code, exec_globals)
                 
+                if metrics is not None:
+                    _record_exec_metrics(metrics, wall_start, cpu_start)
+                    metrics['figures'] = len(plt.get_fignums())
+                
                 # Check if plot was created
                 has_plot = len(plt.get_fignums()) > 0
-                if has_plot:
-                    # Save the plot
-                    plot_filename = f"output_{code_hash}.png"
-                    plot_path = images_dir / plot_filename
-                    plt.savefig(plot_path, dpi=100, bbox_inches='tight')
-                    plt.close('all')
+                if has_plot and images_dir is not None:
+                    # Save the plot under the hash of its pixels
+                    savefig_start = time.perf_counter()
+                    raster = rasterize_figure()
+                    plot_path = images_dir / figure_filename(raster)
+                    if figure_writer is not None:
+                        figure_writer.submit(plot_path, raster)
+                    elif not plot_path.exists():
+                        encode_png(plot_path, *raster)
+                    if metrics is not None:
+                        metrics['savefig_time'] = time.perf_counter() - savefig_start
+                        metrics['figure_bytes'] = plot_path.stat().st_size if figure_writer is None else None
+                plt.close('all')
                 
             except Exception as e:
                 plt.close('all')
-                return f"Error: {type(e).__name__}: {e}", None
+                stdout_buffer.discard()
+                if metrics is not None and 'wall_time' not in metrics:
+                    _record_exec_metrics(metrics, wall_start, cpu_start)
+                return f"Error: {type(e).__name__}: {e}", None, None
     
     # Get output
     output = stdout_buffer.getvalue()
     errors = stderr_buffer.getvalue()
+    stdout_buffer.close()
+    spill_path = stdout_buffer.spill_path
     
     # Format output
     result = ""
@@ -72,148 +501,904 @@ def execute_code_with_context(code, exec_globals, code_hash, images_dir):
     if not result and not plot_path:
         result = "(No output)"
     
-    return result, plot_path
+    return result, plot_path, spill_path
 
-def has_output_after_block(markdown_text, block_end_pos):
-    """Check if there's already an output section after this code block."""
-    # Look at the next 200 characters after the code block
-    next_section = markdown_text[block_end_pos:block_end_pos + 200]
-    # Check for output with or without double newlines
-    return bool(re.match(r'\s*\*\*Output:\*\*', next_section))
+def create_file_globals():
+    """Create the persistent namespace shared by all blocks of a file."""
+    import numpy as np
+    import pandas as pd
+    import matplotlib.pyplot as plt
+    from collections import Counter
+    import scipy.stats as stats
+    
+    return {
+        '__builtins__': __builtins__,
+        'np': np,
+        'pd': pd,
+        'plt': plt,
+        'Counter': Counter,
+        'stats': stats,
+    }
 
-def add_outputs_to_markdown(markdown_text, filepath):
-    """Add outputs after each Python code block."""
-    blocks = extract_code_blocks(markdown_text)
+def book_timeout(config_path=BOOK_CONFIG):
+    """Read execute.timeout from the book's _config.yml, if available."""
+    try:
+        import yaml
+        with open(config_path, 'r', encoding='utf-8') as f:
+            config = yaml.safe_load(f) or {}
+        return int(config.get('execute', {}).get('timeout', FALLBACK_TIMEOUT))
+    except (ImportError, OSError, ValueError, TypeError, AttributeError):
+        return FALLBACK_TIMEOUT
+
+def front_matter(markdown_text):
+    """Parse the YAML front matter of a markdown file (empty dict if none)."""
+    match = re.match(r'---\n(.*?)\n---\n', markdown_text, re.DOTALL)
+    if not match:
+        return {}
+    try:
+        import yaml
+        data = yaml.safe_load(match.group(1))
+    except Exception:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+def resolve_limits(limits, markdown_text):
+    """Merge global limits with a file's `execute_limits` front matter.
+    
+    A file can override either limit, e.g.:
+    
+        ---
+        execute_limits:
+          timeout: 900
+          max_memory: 4096
+        ---
+    """
+    resolved = {'timeout': 0, 'max_memory': 0}
+    resolved.update(limits or {})
+    overrides = front_matter(markdown_text).get('execute_limits') or {}
+    if isinstance(overrides, dict):
+        for key in resolved:
+            if key in overrides:
+                resolved[key] = overrides[key] or 0
+    return resolved
+
+def _process_rss(pid):
+    """Resident set size of a process in bytes (Linux /proc), or None."""
+    try:
+        with open(f'/proc/{pid}/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+def _handle_request(request, file_globals, profiling, max_output, figures):
+    """Carry out one runner request against a namespace and return the reply.
+    
+    Plots are not written by the child: their rasters are sent back with the
+    reply, so a child killed by a later block can't lose a pending image.
+    """
+    kind = request[0]
+    if kind == 'exec':
+        _, code, images_dir = request
+        metrics = {} if profiling else None
+        result = execute_code_with_context(code, file_globals, images_dir, metrics, max_output, figures)
+        return result, metrics, figures.take()
+    if kind == 'save':
+        return save_namespace(file_globals, request[1])
+    if kind == 'restore':
+        return restore_namespace(file_globals, request[1])
+    raise ValueError(f"Unknown runner request: {kind}")
+
+def _supervised_block_loop(conn, profiling, max_output):
+    """Child side of SupervisedRunner: handle requests sent over a pipe."""
+    matplotlib.use('Agg')
+    file_globals = create_file_globals()
+    figures = _DeferredFigures()
+    if profiling:
+        tracemalloc.start()
+    while True:
+        request = conn.recv()
+        if request is None:
+            break
+        conn.send(_handle_request(request, file_globals, profiling, max_output, figures))
+    conn.close()
+
+class InProcessRunner:
+    """Run a file's blocks in this process, in one persistent namespace."""
+    
+    # Only a supervised block can breach a limit
+    breached = False
+    
+    def __init__(self, file_globals, profiling=False, max_output=DEFAULT_MAX_OUTPUT_BYTES, figure_writer=None):
+        self.file_globals = file_globals
+        self.profiling = profiling
+        self.max_output = max_output
+        self.figure_writer = figure_writer
+    
+    def run(self, code, images_dir, metrics=None):
+        """Execute a block (see execute_code_with_context)."""
+        return execute_code_with_context(
+            code, self.file_globals, images_dir, metrics, self.max_output, self.figure_writer
+        )
+    
+    def save_snapshot(self, snapshot_dir):
+        """Checkpoint the namespace; returns False if it can't be serialized."""
+        return save_namespace(self.file_globals, snapshot_dir)
+    
+    def restore_snapshot(self, snapshot_dir):
+        """Replace the namespace with a checkpoint; returns False on failure."""
+        return restore_namespace(self.file_globals, snapshot_dir)
+    
+    def close(self):
+        pass
+
+class SupervisedRunner:
+    """Run a file's blocks in a child process with wall-clock and RSS limits.
+    
+    The child holds the file's namespace. A block that exceeds its budget gets
+    a "Timeout"/"MemoryLimit" error output; the child is then killed, and a
+    fresh one replays the earlier requests (blocks and snapshot restores) to
+    rebuild the namespace before the next block runs. breached tells whether
+    the last block ended that way (or crashed the child).
+    """
+    
+    breached = False
+    
+    def __init__(self, limits, profiling=False, max_output=DEFAULT_MAX_OUTPUT_BYTES, figure_writer=None):
+        self.timeout = limits.get('timeout') or 0
+        self.max_memory = limits.get('max_memory') or 0
+        self.profiling = profiling
+        self.max_output = max_output
+        self.figure_writer = figure_writer
+        self.history = []
+        methods = multiprocessing.get_all_start_methods()
+        self.context = multiprocessing.get_context('fork' if 'fork' in methods else 'spawn')
+        self.process = None
+        self.conn = None
+    
+    def _start(self):
+        self.conn, child_conn = self.context.Pipe()
+        self.process = self.context.Process(
+            target=_supervised_block_loop, args=(child_conn, self.profiling, self.max_output), daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        
+        # A restarted child replays earlier requests to rebuild the namespace
+        for request in self.history:
+            self._exchange(request)
+            if self.process is None:
+                self._start_empty()
+                break
+    
+    def _start_empty(self):
+        """Start a child without replaying history."""
+        history, self.history = self.history, []
+        self._start()
+        self.history = history
+    
+    def _kill(self):
+        if self.process is not None:
+            self.process.kill()
+            self.process.join()
+            self.conn.close()
+        self.process = None
+        self.conn = None
+    
+    def _exchange(self, request):
+        """Send one request to the child and wait for its reply within the limits.
+        
+        Returns (reply, None), or (None, error_text) after a breach or crash,
+        in which case the child has been killed.
+        """
+        if self.process is None:
+            self._start()
+        self.conn.send(request)
+        start = time.perf_counter()
+        limit_bytes = self.max_memory * 1024 * 1024
+        error = None
+        while error is None:
+            if self.conn.poll(SUPERVISOR_POLL_INTERVAL):
+                try:
+                    return self.conn.recv(), None
+                except EOFError:
+                    error = "Error: WorkerCrashed: execution process exited unexpectedly"
+            elif self.timeout and time.perf_counter() - start > self.timeout:
+                error = f"Error: Timeout: block exceeded the {self.timeout}s wall-clock limit"
+            elif limit_bytes:
+                rss = _process_rss(self.process.pid)
+                if rss is not None and rss > limit_bytes:
+                    error = (f"Error: MemoryLimit: block exceeded the {self.max_memory} MB memory limit "
+                             f"(RSS {rss / 1024 / 1024:.0f} MB)")
+        self._kill()
+        return None, error
+    
+    def run(self, code, images_dir, metrics=None):
+        """Execute a block like execute_code_with_context, under the limits."""
+        start = time.perf_counter()
+        reply, error = self._exchange(('exec', code, images_dir))
+        self.breached = error is not None
+        if error is None:
+            result, child_metrics, figures = reply
+            for plot_path, raster in figures:
+                if self.figure_writer is not None:
+                    self.figure_writer.submit(plot_path, raster)
+                else:
+                    encode_png(plot_path, *raster)
+            # Blocks that breached their budget are left out of future replays
+            self.history.append(('exec', code, None))
+        else:
+            result, child_metrics = (error, None, None), None
+        if metrics is not None:
+            metrics.update(child_metrics or {
+                'wall_time': time.perf_counter() - start, 'cpu_time': None, 'peak_memory': None,
+                'figures': 0, 'figure_bytes': 0, 'savefig_time': 0.0,
+            })
+        return result
+    
+    def save_snapshot(self, snapshot_dir):
+        """Checkpoint the child's namespace; returns False if it can't be serialized."""
+        reply, error = self._exchange(('save', snapshot_dir))
+        return error is None and reply
+    
+    def restore_snapshot(self, snapshot_dir):
+        """Replace the child's namespace with a checkpoint; returns False on failure."""
+        reply, error = self._exchange(('restore', snapshot_dir))
+        if error is None and reply:
+            # Future replays start from the snapshot instead of the earlier blocks
+            self.history = [('restore', snapshot_dir)]
+            return True
+        return False
+    
+    def close(self):
+        """Stop the child process."""
+        if self.process is not None:
+            try:
+                self.conn.send(None)
+                self.process.join(timeout=5)
+            except (OSError, ValueError):
+                pass
+            self._kill()
+
+def create_runner(limits, markdown_text, file_globals, profiling=False, max_output=DEFAULT_MAX_OUTPUT_BYTES,
+                  figure_writer=None):
+    """Run blocks in-process, or in a supervised child when limits are set."""
+    limits = resolve_limits(limits, markdown_text)
+    if limits['timeout'] or limits['max_memory']:
+        return SupervisedRunner(limits, profiling=profiling, max_output=max_output, figure_writer=figure_writer)
+    return InProcessRunner(file_globals, profiling=profiling, max_output=max_output, figure_writer=figure_writer)
+
+def format_output_section(output_text, plot_path, spill_path=None):
+    """Format the **Output:** section inserted after a code block."""
+    has_text = output_text and output_text not in ["(No output)", ""]
+    if not plot_path and not has_text:
+        return "\n\n**Output:** `(No output)`\n"
+    
+    output_section = "\n\n**Output:**\n"
+    if has_text:
+        if '\n' in output_text or len(output_text) > 80:
+            output_section += f"```\n{output_text}\n```\n"
+        else:
+            output_section += f"`{output_text}`\n"
+    
+    if spill_path:
+        output_section += f"\n[Full output](images/{spill_path.name})\n"
+    
+    if plot_path:
+        if has_text:
+            output_section += "\n"
+        output_section += f"![Plot](images/{plot_path.name})\n"
+    
+    return output_section
+
+def snapshot_root(cache_dir, filepath):
+    """Directory holding one file's namespace snapshots, named after the file."""
+    digest = hashlib.md5(filepath.as_posix().encode()).hexdigest()[:8]
+    return cache_dir / 'snapshots' / f"{filepath.stem}-{digest}"
+
+def add_outputs_to_markdown(markdown_text, filepath, cache_dir=None, timings=None, profile=None, limits=None,
+                            snapshots=False, dependencies=False, max_output=DEFAULT_MAX_OUTPUT_BYTES,
+                            image_options=None, results=None, refresh=False, index=None):
+    """Add outputs after each Python code block.
+    
+    With a cache_dir, blocks whose chained hash is already cached reuse their
+    stored output, and execution starts at the first changed block. If a timings
+    dict is given, the library import time is recorded under 'startup'. If a
+    profile list is given, one record per executed block is appended to it.
+    limits ({'timeout': s, 'max_memory': MB}, overridable per file through
+    front matter) makes blocks run in a supervised child process. With
+    snapshots (and a cache_dir), the namespace is checkpointed after every
+    executed block, and a changed block k resumes from the checkpoint after
+    block k-1 instead of replaying the prefix. With dependencies (and a
+    cache_dir), blocks are keyed by their dependency graph instead: only
+    changed blocks and their dependents execute, the blocks they read from
+    are replayed, and every other block is skipped. The per-mode block counts
+    are recorded in timings['plan']. Block output beyond max_output bytes is
+    truncated in the markdown and linked to a spill file under images/.
+    image_options ({'optimize': bool, 'webp': bool}) post-processes new plot
+    images, and the optimizer totals are recorded in timings['images']. If a
+    results list is given, every block's (output_text, plot_path, spill_path)
+    is appended to it, whether it was executed or taken from the cache. With
+    refresh, the existing output sections of executed blocks are replaced
+    (used by --watch, where edited blocks still carry their old output).
+    Blocks whose output section is kept write nothing under images/; their
+    plots and spill files only go to the block cache.
+    index is a precomputed index_markdown(markdown_text), if available.
+    """
+    blocks = python_blocks(index) if index is not None else extract_code_blocks(markdown_text)
     
     if not blocks:
         return markdown_text, 0
     
     # Setup images directory
     images_dir = filepath.parent / 'images'
-    images_dir.mkdir(exist_ok=True)
+    images_dir.mkdir(parents=True, exist_ok=True)  # Safe if another worker creates it first
     
     # Import modules once for the file context
+    import_start = time.perf_counter()
     try:
-        import numpy as np
-        import pandas as pd
-        import matplotlib.pyplot as plt
-        from collections import Counter
-        import scipy.stats as stats
-        
-        # Create persistent execution environment for the entire file
-        file_globals = {
-            '__builtins__': __builtins__,
-            'np': np,
-            'pd': pd,
-            'plt': plt,
-            'Counter': Counter,
-            'stats': stats,
-        }
+        file_globals = create_file_globals()
     except ImportError as e:
         return markdown_text, 0
+    if timings is not None:
+        timings['startup'] = time.perf_counter() - import_start
     
-    # Execute ALL blocks to build context, even if they have outputs
+    # Plots are encoded (and optionally optimized) in the background while
+    # later blocks run
+    optimizer = ImageOptimizer(**image_options) if image_options else None
+    figure_writer = FigureWriter(optimizer=optimizer)
+    runner = create_runner(limits, markdown_text, file_globals, profiling=profile is not None, max_output=max_output,
+                           figure_writer=figure_writer)
+    # Plan each block: 'cached' (reuse the stored output), 'replay' (run only
+    # to rebuild context) or 'execute'
+    snapshot_dir = snapshot_root(cache_dir, filepath) if (cache_dir and snapshots and not dependencies) else None
+    if cache_dir and dependencies:
+        # Only stale blocks and the blocks they read from need to run
+        graph = build_dependency_graph([block['code'] for block in blocks])
+        cache_keys = dependency_block_hashes(blocks, graph, filepath)
+        cached = [
+            load_cached_block(cache_dir, key, images_dir if block['output'] is None else None)
+            for block, key in zip(blocks, cache_keys)
+        ]
+        stale = {i for i, result in enumerate(cached) if result is None}
+        needed = ancestors(graph, stale)
+        plan = ['execute' if i in stale else 'replay' if i in needed else 'cached' for i in range(len(blocks))]
+    else:
+        # Look up the cached prefix: everything before the first miss is reused
+        cache_keys = chain_block_hashes(blocks, filepath) if cache_dir else []
+        cached = []
+        if cache_dir:
+            for block, key in zip(blocks, cache_keys):
+                result = load_cached_block(cache_dir, key, images_dir if block['output'] is None else None)
+                if result is None:
+                    break
+                cached.append(result)
+        first_miss = len(cached)
+        
+        # Resume from the namespace checkpoint after the last unchanged block
+        resumed = False
+        if snapshot_dir and 0 < first_miss < len(blocks):
+            checkpoint = snapshot_dir / cache_keys[first_miss - 1]
+            resumed = has_snapshot(checkpoint) and runner.restore_snapshot(checkpoint)
+        prefix_mode = 'replay' if first_miss < len(blocks) and not resumed else 'cached'
+        plan = [prefix_mode if i < first_miss else 'execute' for i in range(len(blocks))]
+    if timings is not None:
+        timings['plan'] = {mode: plan.count(mode) for mode in ('execute', 'replay', 'cached')}
+    
+    # Trace allocations only while profiling; it slows execution noticeably
+    started_tracing = profile is not None and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    
+    # Blocks whose output section is kept write their plots and spill files
+    # here, so they end up in the block cache without cluttering images/
+    staging = tempfile.TemporaryDirectory(prefix='execute_') if cache_dir else None
+    
+    # Execute blocks in order to build context, even if they have outputs
     outputs = []
+    executed = []
+    block_results = []
     for i, block in enumerate(blocks):
         # Check if output already exists
-        has_output = has_output_after_block(markdown_text, block['end'])
+        has_output = block['output'] is not None
+        metrics = {} if profile is not None else None
         
-        # Generate hash for the code block
-        code_hash = hashlib.md5(f"{filepath.name}_{i}_{block['code']}".encode()).hexdigest()[:12]
+        mode = plan[i]
+        keeps_output = has_output and not (refresh and mode == 'execute')
+        if mode == 'execute':
+            if not keeps_output:
+                block_images = images_dir
+            elif staging is not None:
+                block_images = Path(staging.name)
+            else:
+                # Nothing would reference the files, except an exported notebook
+                block_images = images_dir if results is not None else None
+            # Always execute to maintain context
+            output_text, plot_path, spill_path = runner.run(block['code'], block_images, metrics)
+            executed.append((i, output_text, plot_path, spill_path, metrics, runner.breached))
+            if snapshot_dir and i < len(blocks) - 1:
+                # Unserializable namespaces simply leave no checkpoint
+                runner.save_snapshot(snapshot_dir / cache_keys[i])
+        else:
+            output_text, plot_path, spill_path = cached[i]
+            if mode == 'replay':
+                # Run this block only to rebuild context for a later one
+                runner.run(block['code'], None, metrics)
+            else:
+                metrics = None
         
-        # Always execute to maintain context
-        output_text, plot_path = execute_code_with_context(block['code'], file_globals, code_hash, images_dir)
+        if metrics is not None:
+            metrics.update({
+                'file': filepath.as_posix(),
+                'block': i + 1,
+                'line': block['line'],
+                'mode': mode,
+            })
+            profile.append(metrics)
+        block_results.append((output_text, plot_path, spill_path))
         
         # Only save output if block doesn't already have one
-        if has_output:
+        if keeps_output:
             outputs.append(None)
         else:
-            outputs.append((output_text, plot_path))
+            outputs.append((output_text, plot_path, spill_path))
     
-    # Process blocks in reverse order to maintain positions
-    modified_text = markdown_text
-    added_count = 0
+    if started_tracing:
+        tracemalloc.stop()
+    runner.close()
+    if snapshot_dir:
+        # Checkpoints of edited or removed blocks can never be resumed from
+        prune_snapshots(snapshot_dir, set(cache_keys))
     
-    for block, output in zip(reversed(blocks), reversed(outputs)):
+    # Barrier: every plot must be on disk before it is cached or referenced
+    figure_writer.close()
+    if optimizer is not None and timings is not None:
+        timings['images'] = optimizer.stats
+    for i, output_text, plot_path, spill_path, metrics, breached in executed:
+        if metrics is not None and plot_path and metrics.get('figure_bytes') is None:
+            metrics['figure_bytes'] = plot_path.stat().st_size
+        # Limit errors depend on the limits, which the cache key doesn't cover
+        if cache_dir and not breached:
+            store_cached_block(cache_dir, cache_keys[i], output_text, plot_path, spill_path)
+            if outputs[i] is None:
+                # Staged artifacts are deleted below; results point at the cached copies
+                block_results[i] = (
+                    output_text,
+                    cache_dir / f"{cache_keys[i]}.png" if plot_path else None,
+                    cache_dir / f"{cache_keys[i]}.txt" if spill_path else None,
+                )
+    if staging is not None:
+        staging.cleanup()
+    if results is not None:
+        results.extend(block_results)
+    
+    # Insert (or replace) all output sections with a single join
+    edits = []
+    for block, output in zip(blocks, outputs):
         if output is None:
             continue
-        
-        output_text, plot_path = output
-        
-        # Format output section
-        output_section = "\n\n**Output:**\n"
-        
-        if output_text and output_text not in ["(No output)", ""]:
-            if '\n' in output_text or len(output_text) > 80:
-                output_section += f"```\n{output_text}\n```\n"
-            else:
-                output_section += f"`{output_text}`\n"
-        
-        if plot_path:
-            if output_text and output_text not in ["(No output)", ""]:
-                output_section += "\n"
-            output_section += f"![Plot](images/{plot_path.name})\n"
-        
-        if not plot_path and (not output_text or output_text == "(No output)"):
-            output_section = "\n\n**Output:** `(No output)`\n"
-        
-        # Insert output after code block
-        modified_text = (
-            modified_text[:block['end']] +
-            output_section +
-            modified_text[block['end']:]
-        )
-        added_count += 1
-    
-    return modified_text, added_count
+        section = format_output_section(*output)
+        if block['output'] is None:
+            edits.append((block['end'], block['end'], section))
+        else:
+            # The old section swallowed the blank lines after it: put back the
+            # gap an inserted section gets (remove_all_outputs leaves '\n\n', a
+            # file ends with one newline), so a refresh matches a fresh insert
+            end = block['output']['end']
+            edits.append((block['output']['start'], end, section + ('\n\n' if end < len(markdown_text) else '\n')))
+    return apply_edits(markdown_text, edits), len(edits)
 
-def process_file(filepath):
-    """Process a single markdown file."""
-    print(f"Processing: {filepath.name}")
+def process_file(filepath, cache_dir=None, log=print, manifest=None, profile=None, limits=None, snapshots=False,
+                 dependencies=False, max_output=DEFAULT_MAX_OUTPUT_BYTES, image_options=None, image_stats=None,
+                 notebooks=None, incremental=False, refresh=False):
+    """Process a single markdown file.
+    
+    If a manifest dict is given, the file's entry (code fingerprint, images,
+    duration) is refreshed after a successful run; with incremental, the file
+    is skipped when its entry is still up to date. refresh replaces the
+    outputs of re-executed blocks (see add_outputs_to_markdown).
+    If a profile list is given (--profile), per-block records are appended to it.
+    limits are the global per-block timeout/memory limits, snapshots enables
+    namespace checkpoints, dependencies enables dependency-graph planning and
+    max_output caps the inline output of a block and image_options enables
+    plot post-processing (see add_outputs_to_markdown). If an image_stats
+    ImageOptimizer is given, this file's image totals are merged into it.
+    notebooks ({'dir': Path, 'format': 'ipynb'|'myst', 'cache': Path|None})
+    also writes the executed notebook and stores it in the jupyter-cache.
+    """
+    log(f"Processing: {filepath.name}")
     
     # Read file
     try:
         with open(filepath, 'r', encoding='utf-8') as f:
             content = f.read()
     except Exception as e:
-        print(f"  ❌ Error reading file: {e}")
+        log(f"  ❌ Error reading file: {e}")
         return False
     
+    key = filepath.as_posix()
+    if incremental and manifest is not None and can_skip(filepath, content, manifest, notebooks):
+        duration = manifest[key].get('duration', 0.0)
+        log(f"  ⏭️  Skipped: code unchanged since last run (took {duration:.2f}s)")
+        return True
+    
     # Add outputs
-    modified_content, count = add_outputs_to_markdown(content, filepath)
+    timings = {}
+    results = [] if notebooks is not None else None
+    start = time.perf_counter()
+    modified_content, count = add_outputs_to_markdown(
+        content, filepath, cache_dir, timings=timings, profile=profile, limits=limits, snapshots=snapshots,
+        dependencies=dependencies, max_output=max_output, image_options=image_options, results=results,
+        refresh=refresh,
+    )
+    duration = time.perf_counter() - start
+    if 'startup' in timings:
+        log(f"  ⏱️  Startup (library imports): {timings['startup']:.3f}s")
+    if dependencies and 'plan' in timings:
+        plan = timings['plan']
+        log(f"  🔗 Dependency plan: {plan['execute']} executed, {plan['replay']} replayed, {plan['cached']} skipped")
+    if timings.get('images', {}).get('files'):
+        log(f"  🗜️  Images: {format_stats(timings['images'])}")
+        if image_stats is not None:
+            image_stats.merge(timings['images'])
     
     if count == 0:
-        print(f"  ℹ️  No new outputs to add (all blocks already have outputs)")
-        return True
+        log(f"  ℹ️  No new outputs to add (all blocks already have outputs)")
+    else:
+        # Write back
+        try:
+            write_text(filepath, modified_content)
+            log(f"  ✅ {'Updated' if refresh else 'Added'} {count} output(s)")
+        except Exception as e:
+            log(f"  ❌ Error writing file: {e}")
+            return False
+    
+    if notebooks is not None:
+        try:
+            path, cached = export_notebook(modified_content, results, filepath, notebooks['dir'], notebooks['format'],
+                                           notebooks['cache'])
+        except Exception as e:
+            log(f"  ❌ Error writing notebook: {e}")
+            return False
+        log(f"  📓 Notebook: {path}")
+        if cached is False and notebooks['format'] == 'myst':
+            log("  ⚠️  jupyter-cache is not installed, the MyST notebook has no outputs")
+        elif cached is False:
+            log("  ⚠️  jupyter-cache is not installed, notebook not cached")
+    
+    if manifest is not None:
+        manifest[key] = {
+            'fingerprint': code_fingerprint(extract_code_blocks(modified_content)),
+            'images': referenced_images(modified_content),
+            'duration': round(duration, 3),
+            'last_run': datetime.now().isoformat(timespec='seconds'),
+        }
+    return True
+
+def normalize_output(output_text):
+    """Normalize block output for comparison.
+    
+    Missing output and `(No output)` are equivalent, trailing whitespace and
+    line endings are ignored, object addresses (0x7f...) are masked and
+    negative zeros (-0.00) are treated as zeros.
+    """
+    if not output_text or output_text == '(No output)':
+        return ''
+    text = output_text.replace('\r\n', '\n')
+    text = re.sub(r'\b0x[0-9a-fA-F]{6,}\b', '0x...', text)
+    text = re.sub(r'-(0\.0+)\b', r'\1', text)
+    return '\n'.join(line.rstrip() for line in text.strip().split('\n'))
+
+def image_hash(image_path, size=IMAGE_HASH_SIZE):
+    """Perceptual (difference) hash of an image as an int of size*size bits.
+    
+    The image is reduced to a (size+1) x size grayscale thumbnail and each bit
+    records whether a pixel is brighter than its left neighbour, so
+    antialiasing and small rendering differences barely change the hash.
+    """
+    from PIL import Image
+    
+    with Image.open(image_path) as image:
+        thumbnail = image.convert('L').resize((size + 1, size), Image.LANCZOS)
+    pixels = thumbnail.tobytes()
+    bits = 0
+    for row in range(size):
+        for col in range(size):
+            left = pixels[row * (size + 1) + col]
+            right = pixels[row * (size + 1) + col + 1]
+            bits = (bits << 1) | (right > left)
+    return bits
+
+def image_distance(path_a, path_b):
+    """Number of differing bits between the perceptual hashes of two images."""
+    return bin(image_hash(path_a) ^ image_hash(path_b)).count('1')
+
+def check_file(filepath, log=print, limits=None, drift=None, max_output=DEFAULT_MAX_OUTPUT_BYTES):
+    """Re-execute a file and compare its outputs with the markdown.
+    
+    Nothing is written: plots go to a temporary directory. Every drifted
+    block is appended to the drift list as a dict with 'file', 'block',
+    'line', 'kind' ('text' or 'image') and details; blocks without an output
+    section are appended with kind 'missing'. Returns False only if the file
+    couldn't be checked.
+    """
+    log(f"Checking: {filepath.name}")
     
-    # Write back
     try:
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(modified_content)
-        print(f"  ✅ Added {count} output(s)")
-        return True
+        with open(filepath, 'r', encoding='utf-8') as f:
+            content = f.read()
     except Exception as e:
-        print(f"  ❌ Error writing file: {e}")
+        log(f"  ❌ Error reading file: {e}")
         return False
+    
+    blocks = extract_code_blocks(content)
+    if not blocks:
+        log(f"  ℹ️  No code blocks")
+        return True
+    
+    try:
+        file_globals = create_file_globals()
+    except ImportError as e:
+        log(f"  ❌ Error importing libraries: {e}")
+        return False
+    
+    figure_writer = FigureWriter()
+    runner = create_runner(limits, content, file_globals, max_output=max_output, figure_writer=figure_writer)
+    records = []
+    with tempfile.TemporaryDirectory() as tmp:
+        results = [runner.run(block['code'], Path(tmp)) for block in blocks]
+        runner.close()
+        figure_writer.close()
+        
+        for i, (block, (output_text, plot_path, _)) in enumerate(zip(blocks, results)):
+            expected = block['output']
+            record = {'file': filepath.as_posix(), 'block': i + 1, 'line': block['line']}
+            if expected is None:
+                records.append(dict(record, kind='missing'))
+                continue
+            
+            expected_text = normalize_output(expected['text'])
+            actual_text = normalize_output(output_text)
+            if expected_text != actual_text:
+                records.append(dict(record, kind='text', expected=expected_text, actual=actual_text))
+            
+            expected_images = [filepath.parent / path for path in expected['images']]
+            if bool(expected_images) != bool(plot_path):
+                records.append(dict(
+                    record, kind='image',
+                    expected=expected['images'], actual='plot' if plot_path else None,
+                ))
+            elif plot_path:
+                expected_image = expected_images[0]
+                if not expected_image.exists():
+                    records.append(dict(record, kind='image', expected=expected['images'], actual='plot',
+                                        detail='image file not found'))
+                else:
+                    distance = image_distance(expected_image, plot_path)
+                    if distance > IMAGE_HASH_THRESHOLD:
+                        records.append(dict(record, kind='image', expected=expected['images'], actual='plot',
+                                            distance=distance))
+    
+    for record in records:
+        if record['kind'] == 'missing':
+            log(f"  ℹ️  Block {record['block']} (line {record['line']}): no output section to compare")
+            continue
+        log(f"  ⚠️  Block {record['block']} (line {record['line']}): {record['kind']} drift")
+        if record['kind'] == 'text':
+            diff = difflib.unified_diff(
+                record['expected'].split('\n'), record['actual'].split('\n'),
+                'markdown', 'executed', lineterm='', n=1,
+            )
+            for line in list(diff)[2:12]:
+                log(f"      {line}")
+        elif 'distance' in record:
+            log(f"      perceptual hash distance {record['distance']} > {IMAGE_HASH_THRESHOLD}")
+    drifted = sum(record['kind'] != 'missing' for record in records)
+    if not drifted:
+        log(f"  ✅ {len(blocks) - len(records)} block(s) match")
+    if drift is not None:
+        drift.extend(records)
+    return True
+
+def _check_file_in_worker(filepath, limits, max_output):
+    """Run check_file in a pool worker, returning its log lines and drift records."""
+    lines = []
+    drift = []
+    try:
+        ok = check_file(filepath, log=lines.append, limits=limits, drift=drift, max_output=max_output)
+    except Exception as e:
+        lines.append(f"  ❌ Unexpected error: {type(e).__name__}: {e}")
+        ok = False
+    return {'ok': ok, 'log': lines, 'drift': drift}
+
+def write_check_report(report_path, files, drift):
+    """Write the machine-readable --check summary."""
+    drifted = [record for record in drift if record['kind'] != 'missing']
+    report = {
+        'files_checked': len(files),
+        'files_drifted': sorted({record['file'] for record in drifted}),
+        'blocks_drifted': len(drifted),
+        'drift': drifted,
+        'missing': [record for record in drift if record['kind'] == 'missing'],
+    }
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+        f.write('\n')
+
+def _warm_pool_context():
+    """Return a fork-server context that has the heavy libraries pre-imported.
+    
+    The fork server imports PRELOAD_MODULES once; every task then runs in a
+    fresh copy-on-write child forked from it, so each file starts with a clean
+    namespace but pays no import cost. Returns None where fork servers are
+    unavailable (e.g. Windows).
+    """
+    if 'forkserver' not in multiprocessing.get_all_start_methods():
+        return None
+    ctx = multiprocessing.get_context('forkserver')
+    ctx.set_forkserver_preload(['__main__'] + PRELOAD_MODULES)
+    return ctx
+
+def _init_worker():
+    """Give each pool worker its own non-interactive backend."""
+    matplotlib.use('Agg')
+    plt.close('all')
+
+def _process_file_in_worker(filepath, options, manifest, profiling):
+    """Run process_file in a pool worker with the given keyword options.
+    
+    Returns a dict with the success flag, the log lines (instead of printing
+    them), the file's refreshed manifest entry, its profile records and image
+    totals, so the parent can merge everything in input order.
+    """
+    lines = []
+    profile = [] if profiling else None
+    image_stats = ImageOptimizer()
+    try:
+        ok = process_file(filepath, log=lines.append, manifest=manifest, profile=profile, image_stats=image_stats,
+                          **options)
+    except Exception as e:
+        lines.append(f"  ❌ Unexpected error: {type(e).__name__}: {e}")
+        ok = False
+    entry = manifest.get(filepath.as_posix()) if manifest is not None else None
+    return {
+        'ok': ok, 'log': lines, 'manifest_entry': entry, 'profile': profile or [], 'image_stats': image_stats.stats,
+    }
+
+def write_profile_report(report_path, profile):
+    """Write profile records as JSON and as CSV next to it."""
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(profile, f, indent=2)
+        f.write('\n')
+    with open(report_path.with_suffix('.csv'), 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=PROFILE_FIELDS)
+        writer.writeheader()
+        for record in profile:
+            writer.writerow({field: record.get(field) for field in PROFILE_FIELDS})
+
+def print_profile_summary(profile, top=20):
+    """Print the slowest blocks by wall time."""
+    slowest = sorted(profile, key=lambda r: r.get('wall_time') or 0.0, reverse=True)[:top]
+    print(f"Top {len(slowest)} slowest blocks:")
+    print(f"  {'wall':>8} {'cpu':>8} {'peak MB':>8} {'figs':>4} {'savefig':>8}  location")
+    for record in slowest:
+        peak = record.get('peak_memory')
+        peak_text = f"{peak / 1e6:8.1f}" if peak is not None else f"{'-':>8}"
+        print(f"  {record.get('wall_time') or 0.0:7.2f}s {record.get('cpu_time') or 0.0:7.2f}s {peak_text} "
+              f"{record['figures']:>4} {record['savefig_time']:7.2f}s  "
+              f"{record['file']}:{record['line']} (block {record['block']}, {record['mode']})")
+
+def print_plan(run_order, plan, durations, skipped, workers):
+    """Print the --plan dry run: files in submission order and the expected wall time."""
+    print(f"Execution plan ({len(run_order)} file(s), {workers} worker(s)):")
+    for filepath in run_order:
+        if filepath in skipped:
+            print(f"  ⏭️  {'-':>8}  {filepath} (up to date)")
+            continue
+        known = durations[filepath] is not None
+        estimate = plan['estimates'][filepath]
+        source = "last run" if known else "estimated"
+        print(f"  ▶️  {estimate:7.2f}s  {filepath} ({source}, worker {plan['worker'][filepath] + 1})")
+    print()
+    print(f"⏱️  Expected wall time: {plan['makespan']:.1f}s (serial: {plan['serial']:.1f}s)")
+
+def _file_state(filepath):
+    """Modification time and size of a file (None while it is missing)."""
+    try:
+        stat = filepath.stat()
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+def watch_files(files, options, manifest, manifest_path, interval=WATCH_INTERVAL):
+    """Re-run files whenever they are saved, until interrupted.
+    
+    The libraries stay imported in this process (and supervised children
+    are forked from it), and every run plans blocks with the dependency
+    graph: only edited blocks and their dependents execute, and their
+    output sections are replaced in place.
+    """
+    create_file_globals()
+    watch_options = dict(options, dependencies=True, snapshots=False, incremental=False, refresh=True)
+    states = {filepath: _file_state(filepath) for filepath in files}
+    print(f"👀 Watching {len(files)} file(s) for changes (Ctrl+C to stop)")
+    print()
+    try:
+        while True:
+            time.sleep(interval)
+            for filepath in files:
+                state = _file_state(filepath)
+                if state == states[filepath] or state is None:
+                    continue
+                states[filepath] = state
+                start = time.perf_counter()
+                process_file(filepath, manifest=manifest, **watch_options)
+                # Our own write is not a change
+                states[filepath] = _file_state(filepath)
+                save_manifest(manifest_path, manifest)
+                print(f"  ⏱️  Done in {time.perf_counter() - start:.2f}s")
+                print()
+    except KeyboardInterrupt:
+        print()
+        print("👋 Stopped watching")
+    return 0
+
+def positive_int(value):
+    """argparse type for options that must be at least 1 (argparse reports the ValueError)."""
+    number = int(value)
+    if number < 1:
+        raise ValueError(value)
+    return number
 
 def main():
     """Main function."""
     import argparse
     
     parser = argparse.ArgumentParser(description='Add real outputs to Python code blocks in markdown files')
-    parser.add_argument('files', nargs='*', help='Markdown files to process (if empty, processes all in part1 and part2)')
+    parser.add_argument('files', nargs='*', help='Markdown files to process (default: every page listed in --toc, i.e. _toc.yml)')
     parser.add_argument('--part1', action='store_true', help='Process all files in part1/')
     parser.add_argument('--part2', action='store_true', help='Process all files in part2/')
+    parser.add_argument('--toc', default=str(DEFAULT_TOC), help='Table of contents listing the files to process by default (default: _toc.yml)')
+    parser.add_argument('--watch', action='store_true', help='After the first run, keep watching the files and re-execute changed blocks on save')
+    parser.add_argument('--plan', action='store_true', help='Print the execution order and expected wall time without running anything')
+    parser.add_argument('--cache-dir', default=str(DEFAULT_CACHE_DIR), help='Directory for cached block outputs (default: .execute_cache)')
+    parser.add_argument('--no-cache', action='store_true', help='Re-execute every block and ignore the output cache')
+    parser.add_argument('--jobs', '-j', type=int, default=1, help='Number of files to execute in parallel (default: 1)')
+    parser.add_argument('--warm', action='store_true', help='Fork each file from a server with numpy/pandas/scipy/matplotlib pre-imported')
+    parser.add_argument('--incremental', action='store_true', help='Skip files whose code is unchanged since the last successful run')
+    parser.add_argument('--manifest', default=str(DEFAULT_MANIFEST), help='Build manifest with per-file fingerprints and durations, used by --incremental and for scheduling (default: .execute_cache/manifest.json)')
+    parser.add_argument('--timeout', type=int, default=None, help='Per-block wall-clock limit in seconds, 0 to disable (default: execute.timeout from _config.yml)')
+    parser.add_argument('--max-memory', type=int, default=0, help='Per-block resident memory limit in MB, 0 to disable (default: 0)')
+    parser.add_argument('--max-output-bytes', type=positive_int, default=DEFAULT_MAX_OUTPUT_BYTES, help='Inline output cap per block; longer output is truncated and spilled to images/ (default: 10000)')
+    parser.add_argument('--snapshots', action='store_true', help='Checkpoint the namespace after each block so a changed block resumes from the previous state')
+    parser.add_argument('--deps', action='store_true', help='Re-execute only changed blocks and their dependents, using a static read/write analysis of the blocks')
+    parser.add_argument('--optimize-images', action='store_true', help='Losslessly optimize new plot PNGs (palette where exact, max compression)')
+    parser.add_argument('--webp', action='store_true', help='Also write a lossless WebP copy of each new plot')
+    parser.add_argument('--notebooks', action='store_true', help='Also write executed notebooks with real outputs (and store them in the jupyter-cache)')
+    parser.add_argument('--notebook-dir', default=str(DEFAULT_NOTEBOOK_DIR), help='Directory that --notebooks mirrors the book into (default: _build/notebooks)')
+    parser.add_argument('--notebook-format', choices=NOTEBOOK_FORMATS, default='ipynb', help='Notebook format for --notebooks: ipynb, or MyST markdown with outputs in the jupyter-cache (default: ipynb)')
+    parser.add_argument('--jupyter-cache', default=str(DEFAULT_JUPYTER_CACHE), help='jupyter-cache that --notebooks stores executed notebooks in (default: _build/.jupyter_cache)')
+    parser.add_argument('--no-jupyter-cache', action='store_true', help='Write notebooks with --notebooks but do not store them in the jupyter-cache')
+    parser.add_argument('--check', action='store_true', help='Re-execute and report blocks whose output differs from the markdown, without writing files')
+    parser.add_argument('--check-output', default=str(DEFAULT_CHECK_REPORT), help='Drift report written by --check (default: execute_check.json)')
+    parser.add_argument('--profile', action='store_true', help='Record per-block wall/CPU time, peak memory and figure cost')
+    parser.add_argument('--profile-output', default=str(DEFAULT_PROFILE_REPORT), help='Profile report path; a .csv is written alongside (default: execute_profile.json)')
     
     args = parser.parse_args()
     
     # Determine which files to process
     files_to_process = []
     
+    toc = None if args.files else toc_files(Path(args.toc))
     if args.files:
         files_to_process = [Path(f) for f in args.files]
+    elif toc is not None:
+        # Default: every page of the book, in table-of-contents order
+        parts = [part for part, selected in (('part1', args.part1), ('part2', args.part2)) if selected]
+        files_to_process = [filepath for filepath in toc if not parts or filepath.parts[0] in parts]
     else:
-        # Default: process both part1 and part2
+        # Without a TOC: process both part1 and part2
         if args.part1 or (not args.part1 and not args.part2):
             part1_dir = Path('part1')
             if part1_dir.exists():
@@ -233,20 +1418,178 @@ def main():
     print("=" * 60)
     print()
     
-    success_count = 0
+    if args.snapshots and args.no_cache:
+        print("⚠️  --snapshots needs the cache, ignoring it with --no-cache")
+    if args.notebooks and args.notebook_format == 'myst' and args.no_jupyter_cache:
+        print("❌ MyST notebooks keep their outputs in the jupyter-cache, --no-jupyter-cache would drop them")
+        return 1
+    if args.watch and args.no_cache:
+        print("❌ --watch needs the cache to find the changed blocks")
+        return 1
+    if args.deps and args.no_cache:
+        print("⚠️  --deps needs the cache, ignoring it with --no-cache")
+    elif args.deps and args.snapshots:
+        print("⚠️  --deps plans blocks itself, ignoring --snapshots")
+    elif args.snapshots and not args.no_cache and not HAS_DILL:
+        print("⚠️  dill is not installed: no snapshots after blocks that define functions (pip install dill)")
+    options = {
+        'cache_dir': None if args.no_cache else Path(args.cache_dir),
+        'limits': {
+            'timeout': book_timeout() if args.timeout is None else args.timeout,
+            'max_memory': args.max_memory,
+        },
+        'snapshots': args.snapshots and not args.no_cache and not args.deps,
+        # --watch plans by dependencies from the first run on, so its cache keys are reused
+        'dependencies': (args.deps or args.watch) and not args.no_cache,
+        'max_output': args.max_output_bytes,
+        'image_options': {'optimize': args.optimize_images, 'webp': args.webp} if args.optimize_images or args.webp else None,
+        'notebooks': {
+            'dir': Path(args.notebook_dir),
+            'format': args.notebook_format,
+            'cache': None if args.no_jupyter_cache else Path(args.jupyter_cache),
+        } if args.notebooks else None,
+        'incremental': args.incremental,
+    }
+    manifest_path = Path(args.manifest)
+    # Always loaded: its recorded durations drive the schedule
+    manifest = load_manifest(manifest_path)
+    profile = [] if args.profile else None
+    image_stats = ImageOptimizer() if options['image_options'] else None
+    
+    existing_files = []
     for filepath in files_to_process:
         if not filepath.exists():
             print(f"⚠️  File not found: {filepath}")
             continue
+        existing_files.append(filepath)
+    
+    pool_options = {}
+    if args.warm:
+        ctx = _warm_pool_context()
+        if ctx is None:
+            print("⚠️  Fork server not available on this platform, running without --warm")
+        else:
+            # One fresh child per file, forked from the warm server
+            pool_options = {'mp_context': ctx, 'max_tasks_per_child': 1}
+    
+    use_pool = pool_options or (args.jobs > 1 and len(existing_files) > 1)
+    workers = max(1, min(args.jobs, len(existing_files)))
+    
+    # Longest files first, so a slow chapter doesn't start last; logs are
+    # still printed in book order
+    skipped = set()
+    block_counts = {}
+    for filepath in existing_files:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            content = f.read()
+        block_counts[filepath] = len(extract_code_blocks(content))
+        if args.incremental and not args.check and can_skip(filepath, content, manifest, options['notebooks']):
+            skipped.add(filepath)
+    durations = historical_durations(existing_files, manifest)
+    estimates = estimate_durations(durations, block_counts)
+    estimates.update({filepath: 0.0 for filepath in skipped})
+    plan = schedule(existing_files, estimates, workers if use_pool else 1)
+    run_order = plan['order'] if use_pool else existing_files
+    
+    if args.plan:
+        print_plan(run_order, plan, durations, skipped, workers if use_pool else 1)
+        print("=" * 60)
+        return 0
+    
+    if args.check:
+        drift = []
+        success_count = 0
+        if use_pool:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, **pool_options) as pool:
+                futures = {
+                    filepath: pool.submit(_check_file_in_worker, filepath, options['limits'], options['max_output'])
+                    for filepath in run_order
+                }
+                for filepath in existing_files:
+                    result = futures[filepath].result()
+                    for line in result['log']:
+                        print(line)
+                    success_count += result['ok']
+                    drift.extend(result['drift'])
+                    print()
+        else:
+            for filepath in existing_files:
+                success_count += check_file(filepath, limits=options['limits'], drift=drift,
+                                            max_output=options['max_output'])
+                print()
         
-        if process_file(filepath):
-            success_count += 1
+        report_path = Path(args.check_output)
+        write_check_report(report_path, existing_files, drift)
+        drift = [record for record in drift if record['kind'] != 'missing']
+        print("=" * 60)
+        if drift:
+            files = len({record['file'] for record in drift})
+            print(f"❌ Drift in {len(drift)} block(s) across {files} file(s), see {report_path}")
+        else:
+            print(f"✨ No drift: checked {success_count}/{len(files_to_process)} files")
+        print("=" * 60)
+        return 1 if drift or success_count != len(files_to_process) else 0
+    
+    success_count = 0
+    if use_pool:
+        # Each file already runs in its own namespace, so files are independent.
+        # Logs are collected per file and printed in input order.
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, **pool_options) as pool:
+            futures = {
+                filepath: pool.submit(_process_file_in_worker, filepath, options, manifest, args.profile)
+                for filepath in run_order
+            }
+            for filepath in existing_files:
+                result = futures[filepath].result()
+                for line in result['log']:
+                    print(line)
+                if result['ok']:
+                    success_count += 1
+                if result['manifest_entry'] is not None:
+                    manifest[filepath.as_posix()] = result['manifest_entry']
+                if profile is not None:
+                    profile.extend(result['profile'])
+                if image_stats is not None:
+                    image_stats.merge(result['image_stats'])
+                print()
+    else:
+        for filepath in existing_files:
+            if process_file(filepath, manifest=manifest, profile=profile, image_stats=image_stats, **options):
+                success_count += 1
+            print()
+    
+    save_manifest(manifest_path, manifest)
+    
+    if options['notebooks'] is not None:
+        notebooks = options['notebooks']
+        missing = write_build_config(notebooks['dir'], notebooks['cache'], notebooks['format'], toc_path=Path(args.toc))
+        if missing is None:
+            print("⚠️  Could not read _config.yml/_toc.yml (or PyYAML is missing), no notebook book config written")
+        else:
+            print(f"📓 Notebook book: jupyter-book build {notebooks['dir']}")
+            if missing:
+                print(f"   ⚠️  {len(missing)} page(s) of the TOC have no notebook yet, e.g. {missing[0]}")
+        print()
+    
+    if profile is not None:
+        report_path = Path(args.profile_output)
+        write_profile_report(report_path, profile)
+        print_profile_summary(profile)
+        print(f"📊 Profile written to {report_path} and {report_path.with_suffix('.csv')}")
+        print()
+    
+    if image_stats is not None and image_stats.stats['files']:
+        print(f"🗜️  Images: {format_stats(image_stats.stats)}")
         print()
     
     print("=" * 60)
     print(f"✨ Completed! Successfully processed {success_count}/{len(files_to_process)} files")
     print("=" * 60)
     
+    if args.watch:
+        print()
+        return watch_files(existing_files, options, manifest, manifest_path)
+    
     return 0 if success_count == len(files_to_process) else 1
 
 if __name__ == '__main__':
@@ -4,18 +4,23 @@ Fix LaTeX formatting in markdown files.
 Replace \[ \] with $$ $$ for display math.
 """
 
-import re
 import sys
 from pathlib import Path
+from markdown_blocks import index_markdown, apply_edits
+from safe_write import write_text
+
+def latex_fixes(content, index=None):
+    """Return the edits that turn \\[ and \\] delimiter lines into $$.
+    
+    index is a precomputed index_markdown(content), if available.
+    """
+    # Delimiters inside code blocks are left alone
+    math = (index or index_markdown(content))['math']
+    return [(m['start'], m['end'], '$$') for m in math if m['delimiter'] in ('\\[', '\\]')]
 
 def fix_latex_formatting(content):
     """Fix LaTeX display math formatting."""
-    # Replace \[ with $$
-    content = re.sub(r'^\\\[$', r'$$', content, flags=re.MULTILINE)
-    # Replace \] with $$
-    content = re.sub(r'^\\\]$', r'$$', content, flags=re.MULTILINE)
-    
-    return content
+    return apply_edits(content, latex_fixes(content))
 
 def process_file(filepath):
     """Process a single markdown file."""
@@ -35,20 +40,18 @@ def process_file(filepath):
         return True
     
     # Fix formatting
-    original = content
-    fixed = fix_latex_formatting(content)
+    edits = latex_fixes(content)
     
-    if fixed == original:
+    if not edits:
         print(f"  ℹ️  No changes needed")
         return True
     
-    # Count changes
-    changes = content.count(r'\[') + content.count(r'\]')
+    fixed = apply_edits(content, edits)
+    changes = len(edits)
     
     # Write back
     try:
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(fixed)
+        write_text(filepath, fixed)
         print(f"  ✅ Fixed {changes} LaTeX formatting issues")
         return True
     except Exception as e:
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Script to report (or delete) images that no markdown file references.
+
+Every markdown file of the book is indexed for image references, including
+{figure}/{image} directives and the spill-file links of output sections.
+Files in an images/ directory that nothing references are listed, and
+removed with --delete. WebP and @1x/@2x variants of a referenced image
+count as referenced. Only executor outputs (output_*) are considered unless
+--all is given.
+"""
+
+import sys
+from pathlib import Path
+from markdown_blocks import index_markdown
+from image_optimizer import variant_paths
+
+SKIPPED_DIRS = {'_build', 'node_modules'}
+GENERATED_PREFIX = 'output_'
+
+def book_markdown_files(root):
+    """Find the book's markdown files, skipping build and hidden directories."""
+    files = []
+    for path in sorted(root.rglob('*.md')):
+        parts = path.relative_to(root).parts[:-1]
+        if any(part in SKIPPED_DIRS or part.startswith('.') for part in parts):
+            continue
+        files.append(path)
+    return files
+
+def referenced_paths(root, markdown_files):
+    """Resolve every image and output link referenced by the markdown files."""
+    referenced = set()
+    for filepath in markdown_files:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            index = index_markdown(f.read())
+        targets = [image['path'] for image in index['images']]
+        for output in index['outputs']:
+            targets.extend(output['links'])
+        for target in targets:
+            if '://' in target:
+                continue
+            target = target.split('#')[0]
+            # Leading slashes are relative to the book root
+            base = root if target.startswith('/') else filepath.parent
+            referenced.add((base / target.lstrip('/')).resolve())
+    return referenced
+
+def image_directories(root, markdown_files):
+    """Return the images/ directories next to markdown files (and at the root)."""
+    candidates = {root / 'images'} | {filepath.parent / 'images' for filepath in markdown_files}
+    return sorted(directory for directory in candidates if directory.is_dir())
+
+def find_unreferenced(root, include_all=False):
+    """Return (unreferenced image files, broken references)."""
+    markdown_files = book_markdown_files(root)
+    referenced = referenced_paths(root, markdown_files)
+    kept = referenced | {variant.resolve() for path in referenced for variant in variant_paths(path)}
+    unreferenced = []
+    for directory in image_directories(root, markdown_files):
+        for path in sorted(directory.iterdir()):
+            if not path.is_file() or path.name.startswith('.') or path.suffix == '.md':
+                continue
+            if not include_all and not path.name.startswith(GENERATED_PREFIX):
+                continue
+            if path.resolve() not in kept:
+                unreferenced.append(path)
+    broken = sorted(path for path in referenced if not path.exists())
+    return unreferenced, broken
+
+def main():
+    """Main function."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Report or delete images that no markdown file references')
+    parser.add_argument('--root', default='.', help='Book root directory (default: current directory)')
+    parser.add_argument('--delete', action='store_true', help='Delete unreferenced files instead of only reporting them')
+    parser.add_argument('--all', action='store_true', help='Consider every file in images/, not only executor outputs (output_*)')
+
+    args = parser.parse_args()
+    root = Path(args.root).resolve()
+
+    print("=" * 60)
+    print("Image Garbage Collection")
+    print("=" * 60)
+    print()
+
+    unreferenced, broken = find_unreferenced(root, include_all=args.all)
+
+    total_bytes = 0
+    for path in unreferenced:
+        size = path.stat().st_size
+        total_bytes += size
+        if args.delete:
+            path.unlink()
+        print(f"  🗑️  {path.relative_to(root)} ({size / 1024:.1f} KB)")
+
+    for path in broken:
+        try:
+            path = path.relative_to(root)
+        except ValueError:
+            pass
+        print(f"  ⚠️  Referenced but missing: {path}")
+
+    print()
+    print("=" * 60)
+    action = "Deleted" if args.delete else "Found"
+    print(f"✨ {action} {len(unreferenced)} unreferenced file(s), {total_bytes / 1024 / 1024:.2f} MB")
+    if unreferenced and not args.delete:
+        print("   Run with --delete to remove them")
+    print("=" * 60)
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,109 +2,172 @@
 """
 Generate comprehensive plots for Probability and Statistics textbook
 Creates all missing plots referenced in Part 1 chapters with proper paths
+
+Every figure is a function registered with the @figure decorator (name,
+output path relative to the book root, chapter) that draws the figure and
+returns it. The figures are independent of each other, so they are rendered
+in a process pool; --only and --chapter select a subset.
+
+A figure is only rendered again when its cache key changes: the key hashes
+the figure function's source, the global rcParams (including the seaborn
+style), the library versions, the random seed and the output settings, and
+the PNG on disk must still be the one the cache recorded (.figure_cache.json).
+--force renders everything.
+
+Importing this module does no work: numpy, matplotlib and seaborn are
+imported by the figure functions and apply_style(), so --help, --list and
+a run where every figure is cached start quickly. Figures with many points
+draw through large_plots.py, which logs when it bins or rasterizes.
 """
 
-import matplotlib.pyplot as plt
-import numpy as np
-import pandas as pd
-from pathlib import Path
-import seaborn as sns
+import hashlib
+import inspect
+import io
+import json
+import logging
+import os
+import platform
 import sys
-
-# Set style for publication-quality plots
-sns.set_style("whitegrid")
-plt.rcParams['figure.figsize'] = (10, 6)
-plt.rcParams['font.size'] = 11
-plt.rcParams['axes.labelsize'] = 12
-plt.rcParams['axes.titlesize'] = 14
-plt.rcParams['xtick.labelsize'] = 10
-plt.rcParams['ytick.labelsize'] = 10
-plt.rcParams['legend.fontsize'] = 10
+import time
+from concurrent.futures import ProcessPoolExecutor
+from importlib import metadata
+from pathlib import Path
+from image_optimizer import ImageOptimizer, format_stats, is_variant
+from safe_write import write_bytes, write_text
 
 # Get script directory
 SCRIPT_DIR = Path(__file__).parent.absolute()
 ROOT_DIR = SCRIPT_DIR.parent
 
-# Create output directories
+# Output directories (created by main())
 IMAGE_DIR = ROOT_DIR / 'images'
 PART1_DIR = ROOT_DIR / 'part1' / 'images'
 PART2_DIR = ROOT_DIR / 'part2' / 'images'
 
-for dir_path in [IMAGE_DIR, PART1_DIR, PART2_DIR]:
-    dir_path.mkdir(parents=True, exist_ok=True)
+# Style for publication-quality plots, applied by apply_style()
+SEABORN_STYLE = 'whitegrid'
+RC_PARAMS = {
+    'figure.figsize': (10, 6),
+    'font.size': 11,
+    'axes.labelsize': 12,
+    'axes.titlesize': 14,
+    'xtick.labelsize': 10,
+    'ytick.labelsize': 10,
+    'legend.fontsize': 10,
+}
+
+DPI = 300
+SEED = 42  # the global NumPy seed every figure starts from
+
+CACHE_FORMAT_VERSION = 2
+DEFAULT_CACHE = ROOT_DIR / '.figure_cache.json'
+VERSIONED_LIBRARIES = ['matplotlib', 'numpy', 'pandas', 'seaborn', 'scipy', 'pillow']
+# rcParams that describe the session rather than how a figure looks
+VOLATILE_RCPARAMS = {'backend', 'backend_fallback', 'interactive', 'savefig.directory'}
 
-print("\n" + "="*70)
-print("Generating Statistical Plots for Jupyter Book")
-print("="*70)
-print(f"Root directory: {ROOT_DIR}")
-print(f"Output directories:")
-print(f"  - {PART1_DIR}")
-print(f"  - {PART2_DIR}")
-print("="*70 + "\n")
+CHAPTERS = {
+    '1': 'Chapter 1: First Tools for Looking at Data',
+    '2': 'Chapter 2: Looking at Relationships',
+    '10': 'Chapter 10: High Dimensional Data',
+    'part2': 'Part 2: Probability',
+}
+
+# name -> {'name', 'path' (relative to the book root), 'chapter', 'function'}
+FIGURES = {}
+
+_style_applied = False
+
+def apply_style():
+    """Import the plotting libraries and apply the book style (once per process)."""
+    global _style_applied
+    if _style_applied:
+        return
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    sns.set_style(SEABORN_STYLE)
+    plt.rcParams.update(RC_PARAMS)
+    _style_applied = True
+
+def figure(name, path, chapter):
+    """Register a figure function: it draws the figure and returns it."""
+    if chapter not in CHAPTERS:
+        raise ValueError(f"Unknown chapter {chapter!r} for figure {name!r}")
+
+    def register(function):
+        if name in FIGURES:
+            raise ValueError(f"Figure {name!r} is registered twice")
+        FIGURES[name] = {'name': name, 'path': Path(path), 'chapter': chapter, 'function': function}
+        return function
+    return register
 
 # ============================================================================
 # CHAPTER 1: First Tools for Looking at Data
 # ============================================================================
 
-def generate_chapter1_plots():
-    """Generate plots for Chapter 1"""
-    print("[Chapter 1: First Tools for Looking at Data]")
-    
-    # Figure 1.1: Bar charts for student dataset
-    print("  Generating bar charts (gender and goals)...")
+@figure('bar_charts', 'part1/images/fig_1_1_bar_charts.png', chapter='1')
+def plot_bar_charts():
+    """Figure 1.1: Bar charts for student dataset (gender and goals)"""
+    import matplotlib.pyplot as plt
     genders = ['Boy', 'Girl']
     gender_counts = [240, 238]
     goals = ['Sports', 'Grades', 'Popular']
     goal_counts = [140, 220, 118]
-    
+
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 5))
     ax1.bar(genders, gender_counts, color=['steelblue', 'pink'], alpha=0.8, edgecolor='black')
     ax1.set_ylabel('Number of children')
     ax1.set_title('Number of children of each gender')
     ax1.grid(axis='y', alpha=0.3)
-    
+
     ax2.bar(goals, goal_counts, color=['gold', 'lightgreen', 'coral'], alpha=0.8, edgecolor='black')
     ax2.set_ylabel('Number of children')
     ax2.set_title('Number of children choosing each goal')
     ax2.grid(axis='y', alpha=0.3)
-    
+
     plt.tight_layout()
-    plt.savefig(PART1_DIR / 'fig_1_1_bar_charts.png', dpi=300, bbox_inches='tight')
-    plt.close()
-    
-    # Figure 1.2: Histograms
-    print("  Generating histograms (net worth and cheese)...")
-    net_worth = np.array([100360, 109770, 96860, 97860, 108930, 
+    return fig
+
+@figure('histograms', 'part1/images/fig_1_2_histograms.png', chapter='1')
+def plot_histograms():
+    """Figure 1.2: Histograms (net worth and cheese)"""
+    import numpy as np
+    import matplotlib.pyplot as plt
+    net_worth = np.array([100360, 109770, 96860, 97860, 108930,
                           124330, 101300, 112710, 106740, 120170]) / 100000
     cheese_scores = np.array([12.3, 20.9, 39, 47.9, 5.6, 25.9, 37.3, 21.9, 18.1, 21,
                               34.9, 57.2, 0.7, 25.9, 54.9, 40.9, 15.9, 6.4, 18, 38.9])
-    
+
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 5))
     ax1.hist(net_worth, bins=5, edgecolor='black', alpha=0.7, color='steelblue')
     ax1.set_xlabel('Net worth (in $100,000s)')
     ax1.set_ylabel('Number of data items')
     ax1.set_title('Histogram of net worth for 10 individuals')
     ax1.grid(axis='y', alpha=0.3)
-    
+
     ax2.hist(cheese_scores, bins=6, range=(0, 70), edgecolor='black', alpha=0.7, color='orange')
     ax2.set_xlabel('Cheese goodness score')
     ax2.set_ylabel('Number of data items')
     ax2.set_title('Histogram of cheese goodness score for 20 cheeses')
     ax2.grid(axis='y', alpha=0.3)
-    
+
     plt.tight_layout()
-    plt.savefig(PART1_DIR / 'fig_1_2_histograms.png', dpi=300, bbox_inches='tight')
-    plt.close()
-    
-    # Figure 1.3: Body temperature histograms
-    print("  Generating conditional histograms (body temperature)...")
+    return fig
+
+@figure('conditional_histograms', 'part1/images/fig_1_3_conditional_histograms.png', chapter='1')
+def plot_conditional_histograms():
+    """Figure 1.3: Body temperature histograms"""
+    import numpy as np
+    import matplotlib.pyplot as plt
     np.random.seed(42)
     gender1_temp = np.random.normal(98.2, 0.6, 65)
     gender2_temp = np.random.normal(98.6, 0.6, 65)
     all_temp = np.concatenate([gender1_temp, gender2_temp])
-    
+
     fig, axes = plt.subplots(3, 1, figsize=(10, 12))
-    
+
     axes[0].hist(all_temp, bins=15, range=(96, 101), color='steelblue', alpha=0.7, edgecolor='black')
     axes[0].set_xlabel('Temperature (°F)')
     axes[0].set_ylabel('Frequency')
@@ -112,29 +175,31 @@ def generate_chapter1_plots():
     axes[0].axvline(98.4, color='red', linestyle='--', linewidth=2, label='98.4°F')
     axes[0].legend()
     axes[0].grid(axis='y', alpha=0.3)
-    
+
     axes[1].hist(gender1_temp, bins=15, range=(96, 101), color='lightcoral', alpha=0.7, edgecolor='black')
     axes[1].set_xlabel('Temperature (°F)')
     axes[1].set_ylabel('Frequency')
     axes[1].set_title('Gender 1 body temperatures')
     axes[1].grid(axis='y', alpha=0.3)
-    
+
     axes[2].hist(gender2_temp, bins=15, range=(96, 101), color='lightgreen', alpha=0.7, edgecolor='black')
     axes[2].set_xlabel('Temperature (°F)')
     axes[2].set_ylabel('Frequency')
     axes[2].set_title('Gender 2 body temperatures')
     axes[2].grid(axis='y', alpha=0.3)
-    
+
     plt.tight_layout()
-    plt.savefig(PART1_DIR / 'fig_1_3_conditional_histograms.png', dpi=300, bbox_inches='tight')
-    plt.close()
-    
-    # Standard Normal Curve
-    print("  Generating standard normal distribution curve...")
+    return fig
+
+@figure('standard_normal', 'part1/images/fig_1_4_standard_normal.png', chapter='1')
+def plot_standard_normal():
+    """Standard normal distribution curve"""
+    import numpy as np
+    import matplotlib.pyplot as plt
     x = np.linspace(-4, 4, 1000)
     y = (1 / np.sqrt(2 * np.pi)) * np.exp(-x**2 / 2)
-    
-    plt.figure(figsize=(10, 6))
+
+    fig = plt.figure(figsize=(10, 6))
     plt.plot(x, y, 'b-', linewidth=2.5)
     plt.xlabel('Standard deviations from mean')
     plt.ylabel('Density')
@@ -144,123 +209,119 @@ def generate_chapter1_plots():
     plt.fill_between(x, y, where=(x >= -1) & (x <= 1), alpha=0.3, label='±1σ (68%)')
     plt.fill_between(x, y, where=(x >= -2) & (x <= 2), alpha=0.2, label='±2σ (95%)')
     plt.legend()
-    plt.savefig(PART1_DIR / 'fig_1_4_standard_normal.png', dpi=300, bbox_inches='tight')
-    plt.close()
-    
-    # Box Plots
-    print("  Generating box plots...")
+    return fig
+
+@figure('boxplots', 'part1/images/fig_1_5_boxplots.png', chapter='1')
+def plot_boxplots():
+    """Box plots"""
+    import numpy as np
+    import matplotlib.pyplot as plt
     np.random.seed(42)
     data1 = np.random.normal(100, 15, 100)
     data2 = np.random.normal(110, 10, 100)
     data3 = np.random.normal(95, 20, 100)
-    
-    plt.figure(figsize=(10, 6))
+
+    fig = plt.figure(figsize=(10, 6))
     box_data = [data1, data2, data3]
-    bp = plt.boxplot(box_data, labels=['Dataset A', 'Dataset B', 'Dataset C'], 
-                      patch_artist=True, notch=True)
-    
+    bp = plt.boxplot(box_data, patch_artist=True, notch=True)
+    plt.xticks([1, 2, 3], ['Dataset A', 'Dataset B', 'Dataset C'])
+
     colors = ['lightblue', 'lightgreen', 'lightcoral']
     for patch, color in zip(bp['boxes'], colors):
         patch.set_facecolor(color)
-    
+
     plt.ylabel('Values')
     plt.title('Box Plot Comparison')
     plt.grid(axis='y', alpha=0.3)
-    plt.savefig(PART1_DIR / 'fig_1_5_boxplots.png', dpi=300, bbox_inches='tight')
-    plt.close()
-    
-    print("  ✓ Chapter 1 plots completed\n")
+    return fig
 
 # ============================================================================
 # CHAPTER 2: Looking at Relationships
 # ============================================================================
 
-def generate_chapter2_plots():
-    """Generate plots for Chapter 2"""
-    print("[Chapter 2: Looking at Relationships]")
-    
-    # Scatter plots with different correlations
-    print("  Generating scatter plots (correlations)...")
+@figure('scatter_correlations', 'part1/images/fig_2_1_scatter_correlations.png', chapter='2')
+def plot_scatter_correlations():
+    """Scatter plots with different correlations"""
+    import numpy as np
+    import matplotlib.pyplot as plt
     np.random.seed(42)
     n = 100
-    
+
     fig, axes = plt.subplots(2, 2, figsize=(14, 12))
-    
+
     # Strong positive
     x1 = np.random.randn(n)
     y1 = 0.9 * x1 + np.random.randn(n) * 0.3
     axes[0, 0].scatter(x1, y1, alpha=0.6, s=50, edgecolors='black')
     axes[0, 0].set_title(f'Strong Positive (r={np.corrcoef(x1, y1)[0,1]:.2f})')
     axes[0, 0].grid(True, alpha=0.3)
-    
+
     # Weak positive
     x2 = np.random.randn(n)
     y2 = 0.3 * x2 + np.random.randn(n)
     axes[0, 1].scatter(x2, y2, alpha=0.6, s=50, edgecolors='black', color='orange')
     axes[0, 1].set_title(f'Weak Positive (r={np.corrcoef(x2, y2)[0,1]:.2f})')
     axes[0, 1].grid(True, alpha=0.3)
-    
+
     # Strong negative
     x3 = np.random.randn(n)
     y3 = -0.85 * x3 + np.random.randn(n) * 0.4
     axes[1, 0].scatter(x3, y3, alpha=0.6, s=50, edgecolors='black', color='red')
     axes[1, 0].set_title(f'Strong Negative (r={np.corrcoef(x3, y3)[0,1]:.2f})')
     axes[1, 0].grid(True, alpha=0.3)
-    
+
     # No correlation
     x4 = np.random.randn(n)
     y4 = np.random.randn(n)
     axes[1, 1].scatter(x4, y4, alpha=0.6, s=50, edgecolors='black', color='green')
     axes[1, 1].set_title(f'No Correlation (r={np.corrcoef(x4, y4)[0,1]:.2f})')
     axes[1, 1].grid(True, alpha=0.3)
-    
+
     plt.tight_layout()
-    plt.savefig(PART1_DIR / 'fig_2_1_scatter_correlations.png', dpi=300, bbox_inches='tight')
-    plt.close()
-    
-    # Height vs Weight scatter
-    print("  Generating height vs weight scatter plot...")
+    return fig
+
+@figure('height_weight', 'part1/images/fig_2_2_height_weight.png', chapter='2')
+def plot_height_weight():
+    """Height vs Weight scatter plot"""
+    import numpy as np
+    import matplotlib.pyplot as plt
     np.random.seed(42)
     height = np.random.normal(170, 10, 100)
     weight = 0.5 * height + np.random.normal(0, 5, 100) - 10
-    
-    plt.figure(figsize=(10, 6))
+
+    fig = plt.figure(figsize=(10, 6))
     plt.scatter(height, weight, alpha=0.6, s=60, edgecolors='black', color='steelblue')
     plt.xlabel('Height (cm)')
     plt.ylabel('Weight (kg)')
     plt.title('Scatter Plot: Height vs Weight')
     plt.grid(True, alpha=0.3)
-    
+
     # Add regression line
     z = np.polyfit(height, weight, 1)
     p = np.poly1d(z)
     plt.plot(height, p(height), "r--", linewidth=2, label=f'y = {z[0]:.2f}x + {z[1]:.2f}')
     plt.legend()
-    plt.savefig(PART1_DIR / 'fig_2_2_height_weight.png', dpi=300, bbox_inches='tight')
-    plt.close()
-    
-    print("  ✓ Chapter 2 plots completed\n")
+    return fig
 
 # ============================================================================
 # CHAPTER 10: High Dimensional Data
 # ============================================================================
 
-def generate_chapter10_plots():
-    """Generate plots for Chapter 10"""
-    print("[Chapter 10: High Dimensional Data]")
-    
-    # Iris dataset simulation
-    print("  Generating Iris dataset visualization...")
+@figure('iris_scatter', 'part1/images/fig_10_1_iris_scatter.png', chapter='10')
+def plot_iris_scatter():
+    """Iris dataset visualization"""
+    import numpy as np
+    import matplotlib.pyplot as plt
     np.random.seed(42)
-    
+
     setosa_sl = np.random.normal(5.0, 0.35, 50)
     setosa_pl = np.random.normal(1.5, 0.17, 50)
     versicolor_sl = np.random.normal(6.0, 0.5, 50)
     versicolor_pl = np.random.normal(4.3, 0.5, 50)
     virginica_sl = np.random.normal(6.5, 0.6, 50)
     virginica_pl = np.random.normal(5.5, 0.5, 50)
-    
-    plt.figure(figsize=(10, 7))
+
+    fig = plt.figure(figsize=(10, 7))
     plt.scatter(setosa_sl, setosa_pl, label='Setosa', alpha=0.7, s=80, edgecolors='black', marker='o')
     plt.scatter(versicolor_sl, versicolor_pl, label='Versicolor', alpha=0.7, s=80, edgecolors='black', marker='s')
     plt.scatter(virginica_sl, virginica_pl, label='Virginica', alpha=0.7, s=80, edgecolors='black', marker='^')
@@ -269,72 +330,72 @@ def generate_chapter10_plots():
     plt.title('Iris Dataset: Sepal Length vs Petal Length')
     plt.legend()
     plt.grid(True, alpha=0.3)
-    plt.savefig(PART1_DIR / 'fig_10_1_iris_scatter.png', dpi=300, bbox_inches='tight')
-    plt.close()
-    
-    # Scatterplot matrix
-    print("  Generating scatterplot matrix...")
+    return fig
+
+@figure('scatterplot_matrix', 'part1/images/fig_10_2_scatterplot_matrix.png', chapter='10')
+def plot_scatterplot_matrix():
+    """Scatterplot matrix"""
+    import numpy as np
+    from large_plots import scatter_matrix
     np.random.seed(42)
     n_samples = 150
-    
+
     feature1 = np.random.normal(60, 10, n_samples)
     feature2 = 0.7 * feature1 + np.random.normal(0, 5, n_samples)
     feature3 = 0.3 * feature1 + np.random.normal(50, 15, n_samples)
     feature4 = -0.4 * feature2 + np.random.normal(30, 8, n_samples)
-    
-    data_df = pd.DataFrame({
+
+    data = {
         'Height': feature1,
         'Weight': feature2,
         'Age': feature3,
         'Score': feature4
-    })
-    
-    fig = pd.plotting.scatter_matrix(data_df, alpha=0.6, figsize=(12, 12), 
-                                     diagonal='hist', marker='o', s=30, edgecolors='black')
-    plt.suptitle('Scatterplot Matrix: Multiple Features', y=0.995, fontsize=14)
-    plt.savefig(PART1_DIR / 'fig_10_2_scatterplot_matrix.png', dpi=300, bbox_inches='tight')
-    plt.close()
-    
-    print("  ✓ Chapter 10 plots completed\n")
+    }
+
+    # Histograms and scatters switch to binned drawing if the sample grows
+    fig, axes = scatter_matrix(data, figsize=(12, 12), alpha=0.6, marker='o', s=30, edgecolors='black')
+    fig.suptitle('Scatterplot Matrix: Multiple Features', y=0.995, fontsize=14)
+    return fig
 
 # ============================================================================
 # PART 2: Probability Distributions
 # ============================================================================
 
-def generate_part2_plots():
-    """Generate plots for Part 2"""
-    print("[Part 2: Probability]")
-    
-    # Normal distributions with different parameters
-    print("  Generating normal distribution comparisons...")
+@figure('normal_distributions', 'part2/images/fig_normal_distributions.png', chapter='part2')
+def plot_normal_distributions():
+    """Normal distributions with different parameters"""
+    import numpy as np
+    import matplotlib.pyplot as plt
     x = np.linspace(-8, 8, 1000)
-    
-    plt.figure(figsize=(12, 6))
-    
+
+    fig = plt.figure(figsize=(12, 6))
+
     y1 = (1/np.sqrt(2*np.pi*1)) * np.exp(-0.5*((x-0)/1)**2)
     y2 = (1/np.sqrt(2*np.pi*4)) * np.exp(-0.5*((x-0)/2)**2)
     y3 = (1/np.sqrt(2*np.pi*0.25)) * np.exp(-0.5*((x-0)/0.5)**2)
     y4 = (1/np.sqrt(2*np.pi*1)) * np.exp(-0.5*((x-2)/1)**2)
-    
+
     plt.plot(x, y1, linewidth=2, label='μ=0, σ=1')
     plt.plot(x, y2, linewidth=2, label='μ=0, σ=2')
     plt.plot(x, y3, linewidth=2, label='μ=0, σ=0.5')
     plt.plot(x, y4, linewidth=2, label='μ=2, σ=1', linestyle='--')
-    
+
     plt.xlabel('x')
     plt.ylabel('Probability Density')
     plt.title('Normal Distributions with Different Parameters')
     plt.legend()
     plt.grid(alpha=0.3)
-    plt.savefig(PART2_DIR / 'fig_normal_distributions.png', dpi=300, bbox_inches='tight')
-    plt.close()
-    
-    # Binomial distribution
-    print("  Generating binomial distribution...")
+    return fig
+
+@figure('binomial_distributions', 'part2/images/fig_binomial_distributions.png', chapter='part2')
+def plot_binomial_distributions():
+    """Binomial distribution"""
     from scipy.stats import binom
-    
+    import numpy as np
+    import matplotlib.pyplot as plt
+
     fig, axes = plt.subplots(1, 3, figsize=(15, 5))
-    
+
     for idx, (n, p) in enumerate([(10, 0.5), (20, 0.3), (30, 0.7)]):
         x_vals = np.arange(0, n+1)
         y_vals = binom.pmf(x_vals, n, p)
@@ -343,12 +404,176 @@ def generate_part2_plots():
         axes[idx].set_ylabel('P(X=k)')
         axes[idx].set_title(f'Binomial(n={n}, p={p})')
         axes[idx].grid(axis='y', alpha=0.3)
-    
+
     plt.tight_layout()
-    plt.savefig(PART2_DIR / 'fig_binomial_distributions.png', dpi=300, bbox_inches='tight')
-    plt.close()
-    
-    print("  ✓ Part 2 plots completed\n")
+    return fig
+
+@figure('probability_tree', 'part2/images/fig_probability_tree.png', chapter='part2')
+def plot_probability_tree():
+    """Probability tree diagram for a coin flip"""
+    import matplotlib.pyplot as plt
+    fig, ax = plt.subplots(figsize=(10, 8))
+    ax.set_xlim(0, 10)
+    ax.set_ylim(0, 10)
+    ax.axis('off')
+
+    # Title
+    ax.text(5, 9.5, 'Probability Tree: Coin Flip Experiment',
+            ha='center', fontsize=14, fontweight='bold')
+
+    # Root
+    ax.plot([5, 3], [8, 6], 'k-', linewidth=2)
+    ax.plot([5, 7], [8, 6], 'k-', linewidth=2)
+
+    # Labels
+    ax.text(5, 8.3, 'Start', ha='center', fontsize=11,
+            bbox=dict(boxstyle='round', facecolor='lightgray'))
+    ax.text(3.5, 7, 'H\n(p=0.5)', ha='center', fontsize=10)
+    ax.text(6.5, 7, 'T\n(p=0.5)', ha='center', fontsize=10)
+
+    # Leaves
+    ax.text(3, 5.7, 'Heads', ha='center', fontsize=11,
+            bbox=dict(boxstyle='round', facecolor='#4472C4', alpha=0.3))
+    ax.text(7, 5.7, 'Tails', ha='center', fontsize=11,
+            bbox=dict(boxstyle='round', facecolor='#ED7D31', alpha=0.3))
+
+    plt.tight_layout()
+    return fig
+
+# ============================================================================
+# Rendering
+# ============================================================================
+
+def render_figure(name):
+    """Draw a registered figure and write it as a PNG.
+
+    Runs in a worker process. Returns a dict with the name, the success
+    flag, the error message, the elapsed seconds and whether the file was
+    written (an identical PNG is left untouched).
+    """
+    apply_style()
+    import numpy as np
+    import matplotlib.pyplot as plt
+
+    spec = FIGURES[name]
+    start = time.perf_counter()
+    try:
+        (ROOT_DIR / spec['path']).parent.mkdir(parents=True, exist_ok=True)
+        np.random.seed(SEED)
+        fig = spec['function']()
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format='png', dpi=DPI, bbox_inches='tight')
+        written = write_bytes(ROOT_DIR / spec['path'], buffer.getvalue())
+    except Exception as e:
+        return {'name': name, 'ok': False, 'error': f"{type(e).__name__}: {e}",
+                'seconds': time.perf_counter() - start, 'written': False}
+    finally:
+        plt.close('all')
+    return {'name': name, 'ok': True, 'error': None,
+            'seconds': time.perf_counter() - start, 'written': written}
+
+def render_figures(names, jobs):
+    """Render figures, in parallel when jobs > 1. Returns {name: result}."""
+    if jobs > 1 and len(names) > 1:
+        # Imported before the pool starts, so forked workers inherit the libraries
+        apply_style()
+        with ProcessPoolExecutor(max_workers=min(jobs, len(names)), initializer=apply_style) as pool:
+            return dict(zip(names, pool.map(render_figure, names)))
+    return {name: render_figure(name) for name in names}
+
+# ============================================================================
+# Figure Cache
+# ============================================================================
+
+def style_fingerprint():
+    """Serialize the drawing style without importing pyplot or seaborn.
+
+    The style is the matplotlibrc defaults plus SEABORN_STYLE and RC_PARAMS;
+    what the seaborn style sets is fixed by the seaborn version, which is
+    part of the key as well.
+    """
+    import matplotlib
+    # rcParamsOrig is the matplotlibrc as loaded, before apply_style() changed it.
+    # Indexing instead of .items(): reading 'backend' would resolve the backend
+    base = matplotlib.rcParamsOrig
+    params = {key: repr(base[key]) for key in sorted(base) if key not in VOLATILE_RCPARAMS}
+    style = {key: repr(value) for key, value in RC_PARAMS.items()}
+    return json.dumps({'matplotlibrc': params, 'seaborn': SEABORN_STYLE, 'rc': style}, sort_keys=True)
+
+def library_versions():
+    """Versions of the libraries the figures are drawn with (not imported to read them)."""
+    versions = []
+    for name in VERSIONED_LIBRARIES:
+        try:
+            versions.append(f"{name}={metadata.version(name)}")
+        except metadata.PackageNotFoundError:
+            versions.append(f"{name}=missing")
+    return ';'.join(versions)
+
+def cache_environment(optimize):
+    """Everything besides the figure's own source that its PNG depends on."""
+    return '|'.join([
+        f"cache={CACHE_FORMAT_VERSION}", f"python={platform.python_version()}", library_versions(),
+        f"seed={SEED}", f"dpi={DPI}", f"optimize={optimize}",
+        f"helpers={file_digest(SCRIPT_DIR / 'large_plots.py')}", style_fingerprint(),
+    ])
+
+def figure_key(name, environment):
+    """Cache key of a figure: its function's source (decorator included) and the environment."""
+    spec = FIGURES[name]
+    source = inspect.getsource(spec['function'])
+    return hashlib.sha256(f"{environment}\0{spec['path'].as_posix()}\0{source}".encode('utf-8')).hexdigest()
+
+def file_digest(path):
+    """SHA-256 of a file's bytes (None if it doesn't exist)."""
+    try:
+        return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+    except OSError:
+        return None
+
+def load_cache(path=DEFAULT_CACHE):
+    """Load the figure cache ({name: {'key', 'sha256'}}); empty if missing or unreadable."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_cache(cache, path=DEFAULT_CACHE):
+    """Write the figure cache."""
+    write_text(path, json.dumps(cache, indent=2, sort_keys=True) + '\n')
+
+def cache_miss_reason(name, key, cache):
+    """Why a figure must be rendered, or None if its PNG is up to date."""
+    entry = cache.get(name)
+    if not entry:
+        return 'not cached'
+    if entry.get('key') != key:
+        return 'code or style changed'
+    digest = file_digest(ROOT_DIR / FIGURES[name]['path'])
+    if digest is None:
+        return 'output missing'
+    if digest != entry.get('sha256'):
+        return 'output modified'
+    return None
+
+def select_figures(only=None, chapters=None):
+    """Return the registered figure names matching --only and --chapter, in registry order.
+
+    Raises ValueError for unknown names or chapters.
+    """
+    unknown = [name for name in only or [] if name not in FIGURES]
+    unknown += [f"chapter {chapter}" for chapter in chapters or [] if chapter not in CHAPTERS]
+    if unknown:
+        raise ValueError(f"Unknown figure(s): {', '.join(unknown)}")
+    return [
+        name for name, spec in FIGURES.items()
+        if (not only or name in only) and (not chapters or spec['chapter'] in chapters)
+    ]
+
+def _split_list(values):
+    """Flatten repeated and comma-separated command-line values."""
+    return [item.strip() for value in values or [] for item in value.split(',') if item.strip()]
 
 # ============================================================================
 # Update Markdown Files with Image Paths
@@ -357,10 +582,10 @@ def generate_part2_plots():
 def update_markdown_files():
     """Update markdown files with correct image paths"""
     print("[Updating Markdown Files]")
-    
+
     # Find all markdown files in part1
     part1_md_files = list((ROOT_DIR / 'part1').glob('*.md'))
-    
+
     image_mapping = {
         'bar charts': 'images/fig_1_1_bar_charts.png',
         'histogram': 'images/fig_1_2_histograms.png',
@@ -372,26 +597,26 @@ def update_markdown_files():
         'iris': 'images/fig_10_1_iris_scatter.png',
         'scatterplot matrix': 'images/fig_10_2_scatterplot_matrix.png',
     }
-    
+
     print(f"  Found {len(part1_md_files)} markdown files in part1/")
-    
-    # Create a summary file
+
+    # Create a summary file (left untouched when its content is the same)
     summary_path = PART1_DIR / 'README.md'
-    with open(summary_path, 'w') as f:
-        f.write("# Generated Statistical Plots\n\n")
-        f.write("This directory contains automatically generated plots for the statistics textbook.\n\n")
-        f.write("## Available Figures\n\n")
-        
-        all_images = sorted(PART1_DIR.glob('*.png'))
-        for img in all_images:
-            f.write(f"- `{img.name}`\n")
-        
-        f.write("\n## Usage in Markdown\n\n")
-        f.write("To include these images in your markdown files, use:\n\n")
-        f.write("```markdown\n")
-        f.write("![Description](images/filename.png)\n")
-        f.write("```\n")
-    
+    lines = ["# Generated Statistical Plots\n\n"]
+    lines.append("This directory contains automatically generated plots for the statistics textbook.\n\n")
+    lines.append("## Available Figures\n\n")
+
+    all_images = sorted(PART1_DIR.glob('*.png'))
+    for img in all_images:
+        lines.append(f"- `{img.name}`\n")
+
+    lines.append("\n## Usage in Markdown\n\n")
+    lines.append("To include these images in your markdown files, use:\n\n")
+    lines.append("```markdown\n")
+    lines.append("![Description](images/filename.png)\n")
+    lines.append("```\n")
+    write_text(summary_path, ''.join(lines))
+
     print(f"  ✓ Created summary file: {summary_path}")
     print("  ✓ Markdown update completed\n")
 
@@ -399,26 +624,116 @@ def update_markdown_files():
 # Main Execution
 # ============================================================================
 
+def optimize_images(optimizer, paths):
+    """Losslessly optimize the generated figures and write their variants."""
+    print("Optimizing images...")
+    for path in paths:
+        if path.exists() and not is_variant(path):
+            optimizer.process(path)
+    print(f"  ✓ {format_stats(optimizer.stats)}\n")
+
 def main():
     """Main function to generate all plots"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Generate the statistical plots for the Jupyter Book')
+    parser.add_argument('--only', action='append', metavar='NAMES', help='Comma-separated figure names to render (repeatable; see --list)')
+    parser.add_argument('--chapter', action='append', metavar='CHAPTERS', help=f"Comma-separated chapters to render (repeatable): {', '.join(CHAPTERS)}")
+    parser.add_argument('--list', action='store_true', help='List the registered figures and exit')
+    parser.add_argument('--jobs', '-j', type=int, default=os.cpu_count() or 1, help='Number of figures rendered in parallel (default: number of CPUs)')
+    parser.add_argument('--force', action='store_true', help='Render every selected figure, even if its cache entry is current')
+    parser.add_argument('--cache', default=str(DEFAULT_CACHE), help='Figure cache file (default: .figure_cache.json in the book root)')
+    parser.add_argument('--no-optimize', action='store_true', help='Skip lossless PNG optimization of the generated figures')
+    parser.add_argument('--webp', action='store_true', help='Also write a lossless WebP copy of each figure')
+    parser.add_argument('--variants', action='store_true', help='Also write @1x/@2x (100/200 DPI) copies of each figure')
+
+    args = parser.parse_args()
+
+    if args.list:
+        for name, spec in FIGURES.items():
+            print(f"  {name:<24} {spec['chapter']:<6} {spec['path'].as_posix()}")
+        return 0
+
     try:
-        # Generate all plots
-        generate_chapter1_plots()
-        generate_chapter2_plots()
-        generate_chapter10_plots()
-        generate_part2_plots()
-        
+        names = select_figures(_split_list(args.only), _split_list(args.chapter))
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 2
+    if not names:
+        print("No figures match --only/--chapter!")
+        return 1
+
+    print("\n" + "="*70)
+    print("Generating Statistical Plots for Jupyter Book")
+    print("="*70)
+    print(f"Root directory: {ROOT_DIR}")
+    print(f"Output directories:")
+    print(f"  - {PART1_DIR}")
+    print(f"  - {PART2_DIR}")
+    print("="*70 + "\n")
+
+    for dir_path in [IMAGE_DIR, PART1_DIR, PART2_DIR]:
+        dir_path.mkdir(parents=True, exist_ok=True)
+
+    # large_plots' binning/rasterization decisions (forked workers inherit this)
+    logging.basicConfig(level=logging.INFO, format='  📉 %(message)s')
+
+    try:
+        cache_path = Path(args.cache)
+        cache = load_cache(cache_path)
+        environment = cache_environment(not args.no_optimize)
+        keys = {name: figure_key(name, environment) for name in names}
+        reasons = {name: 'forced' if args.force else cache_miss_reason(name, keys[name], cache) for name in names}
+        to_render = [name for name in names if reasons[name]]
+
+        start = time.perf_counter()
+        results = render_figures(to_render, args.jobs)
+        elapsed = time.perf_counter() - start
+
+        for chapter, title in CHAPTERS.items():
+            chapter_names = [name for name in names if FIGURES[name]['chapter'] == chapter]
+            if not chapter_names:
+                continue
+            print(f"[{title}]")
+            for name in chapter_names:
+                result = results.get(name)
+                if result is None:
+                    print(f"  ⏭️  {name}: {FIGURES[name]['path'].as_posix()} (cached)")
+                elif result['ok']:
+                    status = "" if result['written'] else ", unchanged"
+                    print(f"  ✓ {name}: {FIGURES[name]['path'].as_posix()} ({result['seconds']:.2f}s, {reasons[name]}{status})")
+                else:
+                    print(f"  ❌ {name}: {result['error']}")
+            print()
+
+        rendered = [ROOT_DIR / FIGURES[name]['path'] for name in to_render if results[name]['ok']]
+        cached = [ROOT_DIR / FIGURES[name]['path'] for name in names if name not in results]
+        # Cached PNGs are already optimized; only the extra copies may be missing
+        targets = rendered + cached if args.webp or args.variants else rendered
+        if targets and (not args.no_optimize or args.webp or args.variants):
+            optimize_images(ImageOptimizer(optimize=not args.no_optimize, webp=args.webp, variants=args.variants), targets)
+
+        # Record the final (optimized) bytes, so a modified PNG is noticed
+        for name in to_render:
+            if results[name]['ok']:
+                cache[name] = {'key': keys[name], 'sha256': file_digest(ROOT_DIR / FIGURES[name]['path'])}
+        save_cache(cache, cache_path)
+
         # Update markdown files
         update_markdown_files()
-        
+
         # Summary
+        failed = [name for name in to_render if not results[name]['ok']]
         print("="*70)
         print("SUMMARY")
         print("="*70)
-        
-        part1_images = list(PART1_DIR.glob('*.png'))
-        part2_images = list(PART2_DIR.glob('*.png'))
-        
+
+        part1_images = [p for p in PART1_DIR.glob('*.png') if not is_variant(p)]
+        part2_images = [p for p in PART2_DIR.glob('*.png') if not is_variant(p)]
+
+        hit_rate = 100.0 * len(cached) / len(names)
+        print(f"✓ Cache: {len(cached)} hit(s), {len(to_render)} miss(es) ({hit_rate:.0f}% hit rate)")
+        print(f"✓ Rendered {len(rendered)}/{len(to_render)} figures in {elapsed:.2f}s ({max(1, min(args.jobs, len(to_render)))} process(es))")
         print(f"✓ Part 1 plots: {len(part1_images)} images")
         print(f"✓ Part 2 plots: {len(part2_images)} images")
         print(f"✓ Total plots: {len(part1_images) + len(part2_images)} images")
@@ -427,10 +742,13 @@ def main():
         print(f"  - {PART1_DIR}")
         print(f"  - {PART2_DIR}")
         print("="*70)
+        if failed:
+            print(f"\n❌ {len(failed)} figure(s) failed: {', '.join(failed)}\n")
+            return 1
         print("\n✓ ALL PLOTS GENERATED SUCCESSFULLY!\n")
-        
+
         return 0
-        
+
     except Exception as e:
         print(f"\n❌ ERROR: {str(e)}")
         import traceback
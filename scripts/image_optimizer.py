@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Lossless post-processing for the book's PNG images.
+
+optimize_png() rewrites a PNG with maximum compression, drops an alpha
+channel that is fully opaque and switches to a palette when the image has at
+most 256 colors; a candidate is kept only if it decodes to the same pixels
+and is smaller. write_variants() adds @1x/@2x copies resampled to 100/200 DPI
+from a higher-resolution master, and write_webp() adds a lossless WebP copy.
+ImageOptimizer runs these steps for the executor and the figure generators
+and keeps byte totals for the report.
+
+Run directly to post-process existing images:
+
+    python scripts/image_optimizer.py                 # part*/images and images/
+    python scripts/image_optimizer.py --webp --variants part1/images
+"""
+
+import io
+import sys
+import threading
+from pathlib import Path
+from safe_write import write_bytes
+
+BASE_DPI = 100
+VARIANT_SCALES = {'@1x': 1, '@2x': 2}
+
+def variant_path(path, suffix, extension=None):
+    """Return the path of a variant, e.g. fig.png -> fig@2x.png or fig.webp."""
+    path = Path(path)
+    return path.with_name(f"{path.stem}{suffix}{extension or path.suffix}")
+
+def variant_paths(path):
+    """All variant files the optimizer may write for an image."""
+    paths = [variant_path(path, suffix) for suffix in VARIANT_SCALES]
+    return paths + [variant_path(candidate, '', '.webp') for candidate in [Path(path)] + paths]
+
+def is_variant(path):
+    """Check whether a file name is an @1x/@2x variant."""
+    return Path(path).stem.endswith(tuple(VARIANT_SCALES))
+
+def _png_options(image):
+    """Keep the DPI and text metadata of the original PNG."""
+    from PIL import PngImagePlugin
+
+    options = {}
+    if 'dpi' in image.info:
+        options['dpi'] = tuple(round(value) for value in image.info['dpi'])
+    text = getattr(image, 'text', None) or {}
+    if text:
+        info = PngImagePlugin.PngInfo()
+        for key, value in text.items():
+            info.add_text(key, value)
+        options['pnginfo'] = info
+    return options
+
+def _encode_smallest(image, options):
+    """Encode the smallest lossless PNG of an image. Returns the bytes."""
+    from PIL import Image
+
+    rgba = image.convert('RGBA')
+    pixels = rgba.tobytes()
+    base = rgba.convert('RGB') if rgba.getchannel('A').getextrema() == (255, 255) else rgba
+
+    candidates = [base]
+    if base.getcolors(256) is not None:
+        method = Image.Quantize.MEDIANCUT if base.mode == 'RGB' else Image.Quantize.FASTOCTREE
+        palette = base.quantize(colors=256, method=method, dither=Image.Dither.NONE)
+        # Palette quantization is only safe if it reproduces every pixel exactly
+        if palette.convert('RGBA').tobytes() == pixels:
+            candidates.append(palette)
+
+    best = None
+    for candidate in candidates:
+        buffer = io.BytesIO()
+        candidate.save(buffer, format='png', optimize=True, **options)
+        if best is None or buffer.tell() < len(best):
+            best = buffer.getvalue()
+    return best
+
+def optimize_png(path):
+    """Losslessly shrink a PNG in place. Returns (bytes_before, bytes_after)."""
+    from PIL import Image
+
+    path = Path(path)
+    before = path.stat().st_size
+    with Image.open(path) as image:
+        image.load()
+        data = _encode_smallest(image, _png_options(image))
+    if len(data) >= before:
+        return before, before
+    write_bytes(path, data)
+    return before, len(data)
+
+def write_variants(path):
+    """Write @1x/@2x copies resampled to 100/200 DPI from a higher-DPI master.
+
+    Variants at or above the master's own resolution are skipped, so a
+    100 DPI image gets no variants. Returns the written paths.
+    """
+    from PIL import Image
+
+    path = Path(path)
+    written = []
+    with Image.open(path) as image:
+        image.load()
+        dpi = image.info.get('dpi', (BASE_DPI,))[0]
+        options = _png_options(image)
+        for suffix, scale in VARIANT_SCALES.items():
+            target = BASE_DPI * scale
+            if dpi <= target + 0.5:
+                continue
+            size = (max(1, round(image.width * target / dpi)), max(1, round(image.height * target / dpi)))
+            resized = image.convert('RGBA').resize(size, Image.LANCZOS)
+            options['dpi'] = (target, target)
+            output = variant_path(path, suffix)
+            write_bytes(output, _encode_smallest(resized, options))
+            written.append(output)
+    return written
+
+def write_webp(path):
+    """Write a lossless WebP copy next to a PNG. Returns its path, or None if unsupported."""
+    from PIL import Image, features
+
+    if not features.check('webp'):
+        return None
+    path = Path(path)
+    output = variant_path(path, '', '.webp')
+    with Image.open(path) as image:
+        buffer = io.BytesIO()
+        image.save(buffer, format='webp', lossless=True, quality=100, method=6)
+    write_bytes(output, buffer.getvalue())
+    return output
+
+class ImageOptimizer:
+    """Post-process freshly written PNGs and keep byte totals.
+
+    Safe to call from several threads (the executor's figure writer).
+    """
+
+    def __init__(self, optimize=True, webp=False, variants=False):
+        self.optimize = optimize
+        self.webp = webp
+        self.variants = variants
+        self.lock = threading.Lock()
+        self.stats = {'files': 0, 'bytes_before': 0, 'bytes_after': 0, 'extra_files': 0, 'extra_bytes': 0}
+
+    def process(self, path):
+        """Optimize one PNG and write its requested variants."""
+        path = Path(path)
+        if self.optimize:
+            before, after = optimize_png(path)
+        else:
+            before = after = path.stat().st_size
+        extra = write_variants(path) if self.variants else []
+        if self.webp:
+            extra = extra + [webp for webp in map(write_webp, [path] + extra) if webp is not None]
+        with self.lock:
+            self.stats['files'] += 1
+            self.stats['bytes_before'] += before
+            self.stats['bytes_after'] += after
+            self.stats['extra_files'] += len(extra)
+            self.stats['extra_bytes'] += sum(extra_path.stat().st_size for extra_path in extra)
+
+    def merge(self, stats):
+        """Add totals from another optimizer (e.g. a pool worker)."""
+        with self.lock:
+            for key, value in stats.items():
+                self.stats[key] += value
+
+def format_stats(stats):
+    """One-line summary of optimizer totals."""
+    before, after = stats['bytes_before'], stats['bytes_after']
+    saved = before - after
+    percent = 100.0 * saved / before if before else 0.0
+    line = (f"{stats['files']} image(s), {before / 1024:.1f} KB → {after / 1024:.1f} KB "
+            f"(saved {saved / 1024:.1f} KB, {percent:.1f}%)")
+    if stats['extra_files']:
+        line += f"; {stats['extra_files']} variant file(s), {stats['extra_bytes'] / 1024:.1f} KB"
+    return line
+
+def main():
+    """Main function."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Losslessly optimize PNG images and write WebP / @1x/@2x variants')
+    parser.add_argument('paths', nargs='*', help='PNG files or directories (default: part*/images and images/)')
+    parser.add_argument('--no-optimize', action='store_true', help='Skip lossless PNG optimization')
+    parser.add_argument('--webp', action='store_true', help='Also write a lossless WebP copy of each image')
+    parser.add_argument('--variants', action='store_true', help='Also write @1x/@2x (100/200 DPI) copies of higher-DPI images')
+
+    args = parser.parse_args()
+
+    roots = [Path(p) for p in args.paths] or sorted(Path('.').glob('part*/images')) + [Path('images')]
+    files = []
+    for root in roots:
+        if root.is_dir():
+            files.extend(sorted(root.glob('*.png')))
+        elif root.suffix == '.png' and root.exists():
+            files.append(root)
+    files = [path for path in files if not is_variant(path)]
+
+    print("=" * 60)
+    print("Image Optimizer")
+    print("=" * 60)
+    print()
+
+    optimizer = ImageOptimizer(optimize=not args.no_optimize, webp=args.webp, variants=args.variants)
+    for path in files:
+        before = optimizer.stats['bytes_after']
+        try:
+            optimizer.process(path)
+        except OSError as e:
+            print(f"  ❌ {path}: {e}")
+            continue
+        size = optimizer.stats['bytes_after'] - before
+        print(f"  ✅ {path} ({size / 1024:.1f} KB)")
+
+    print()
+    print("=" * 60)
+    print(f"✨ {format_stats(optimizer.stats)}")
+    print("=" * 60)
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
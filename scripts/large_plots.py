@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Plotting helpers whose render time stays flat as the data grows.
+
+scatter() draws an ordinary scatter for small inputs, a rasterized scatter
+above RASTER_THRESHOLD points (vector output then embeds one image instead
+of one path per marker) and, above DENSITY_THRESHOLD points, a 2D histogram
+binned with one np.bincount (or a hexbin), so matplotlib draws a fixed grid
+whatever the number of points. hist() bins with np.histogram and hands
+matplotlib one weighted value per bin; the bars look exactly like
+ax.hist(data). scatter_matrix() builds a pairs plot from both. Every switch
+is logged on the 'large_plots' logger.
+
+Run directly to time the helpers against plain matplotlib:
+
+    python scripts/large_plots.py                       # 10k, 100k and 1M points
+    python scripts/large_plots.py --points 5000 --factor 100 --steps 5
+"""
+
+import io
+import logging
+import sys
+import time
+import numpy as np
+
+RASTER_THRESHOLD = 5_000     # points; above this, scatters are rasterized
+DENSITY_THRESHOLD = 50_000   # points; above this, scatters become 2D histograms
+DENSITY_BINS = 100           # bins per axis of the 2D histogram / hexbin gridsize
+
+log = logging.getLogger('large_plots')
+
+def _edges(values, bins):
+    """Equal-width bin edges spanning values (widened when they are all equal)."""
+    if not values.size:
+        return np.linspace(0.0, 1.0, bins + 1)
+    low, high = float(values.min()), float(values.max())
+    if low == high:
+        low, high = low - 0.5, high + 0.5
+    return np.linspace(low, high, bins + 1)
+
+def histogram2d(x, y, bins=DENSITY_BINS):
+    """np.histogram2d for equal-width bins, computed with one np.bincount.
+
+    Returns (counts, xedges, yedges) with counts indexed [x bin, y bin].
+    """
+    xedges, yedges = _edges(x, bins), _edges(y, bins)
+    # Bin index from the offset: no per-point search over the edges
+    ix = ((x - xedges[0]) * (bins / (xedges[-1] - xedges[0]))).astype(np.intp)
+    iy = ((y - yedges[0]) * (bins / (yedges[-1] - yedges[0]))).astype(np.intp)
+    # The maximum lands on the closing edge, which belongs to the last bin
+    np.minimum(ix, bins - 1, out=ix)
+    np.minimum(iy, bins - 1, out=iy)
+    counts = np.bincount(ix * bins + iy, minlength=bins * bins).reshape(bins, bins)
+    return counts, xedges, yedges
+
+def scatter(ax, x, y, density='hist2d', bins=DENSITY_BINS, cmap='Blues',
+            raster_threshold=RASTER_THRESHOLD, density_threshold=DENSITY_THRESHOLD, **kwargs):
+    """Scatter y against x on ax, switching representation as the point count grows.
+
+    density is 'hist2d' or 'hexbin'. Above density_threshold the marker
+    options in kwargs don't apply and only 'label' is kept. Returns the
+    matplotlib artist.
+    """
+    x = np.asarray(x, dtype=float).ravel()
+    y = np.asarray(y, dtype=float).ravel()
+    n = len(x)
+
+    if n > density_threshold:
+        finite = np.isfinite(x) & np.isfinite(y)
+        x, y = x[finite], y[finite]
+        label = kwargs.get('label')
+        if density == 'hexbin':
+            log.info("scatter: %d points > %d, hexbin (gridsize %d)", n, density_threshold, bins)
+            return ax.hexbin(x, y, gridsize=bins, cmap=cmap, mincnt=1, linewidths=0, label=label)
+        log.info("scatter: %d points > %d, 2D histogram (%dx%d bins)", n, density_threshold, bins, bins)
+        counts, xedges, yedges = histogram2d(x, y, bins=bins)
+        # Empty bins stay transparent, like the background of a scatter
+        counts = np.ma.masked_equal(counts, 0)
+        return ax.pcolormesh(xedges, yedges, counts.T, cmap=cmap, rasterized=True, label=label)
+
+    if n > raster_threshold and 'rasterized' not in kwargs:
+        log.info("scatter: %d points > %d, rasterized markers", n, raster_threshold)
+        kwargs['rasterized'] = True
+    return ax.scatter(x, y, **kwargs)
+
+def hist(ax, data, bins=10, range=None, density=False, **kwargs):
+    """Histogram of data on ax, binned with NumPy before matplotlib sees it.
+
+    Takes the arguments of ax.hist for a single dataset. Returns
+    (counts, edges, patches) like ax.hist.
+    """
+    data = np.asarray(data, dtype=float).ravel()
+    data = data[np.isfinite(data)]
+    counts, edges = np.histogram(data, bins=bins, range=range, density=density)
+    if len(data) > RASTER_THRESHOLD:
+        log.info("hist: %d values pre-binned into %d bins", len(data), len(counts))
+    # One value per bin, weighted by its count: same bars, no per-point work
+    return ax.hist(edges[:-1], bins=edges, weights=counts, **kwargs)
+
+def scatter_matrix(columns, figsize=(12, 12), bins=10, diagonal_kwargs=None, **scatter_kwargs):
+    """Pairs plot of a {name: values} mapping or a DataFrame.
+
+    The diagonal holds hist() of each column and the other cells scatter()
+    of one column against another, so large columns stay cheap. Returns
+    (fig, axes).
+    """
+    import matplotlib.pyplot as plt
+
+    names = list(columns)
+    count = len(names)
+    fig, axes = plt.subplots(count, count, figsize=figsize, squeeze=False, sharex='col')
+    for i, row in enumerate(names):
+        for j, column in enumerate(names):
+            ax = axes[i, j]
+            if i == j:
+                hist(ax, columns[column], bins=bins, **(diagonal_kwargs or {}))
+            else:
+                scatter(ax, columns[column], columns[row], **scatter_kwargs)
+            # Labels on the outer edge only, as in pandas.plotting.scatter_matrix
+            ax.tick_params(labelbottom=i == count - 1, labelleft=j == 0)
+            if i == count - 1:
+                ax.set_xlabel(column)
+            if j == 0:
+                ax.set_ylabel(row)
+    if count > 1:
+        # The first diagonal cell plots counts, but its y labels are the first
+        # row's: place that row's ticks on it in its own units, as pandas does
+        low, high = axes[0, 1].get_ylim()
+        bottom, top = axes[0, 0].get_ylim()
+        locs = [loc for loc in axes[0, 1].get_yticks() if low <= loc <= high]
+        axes[0, 0].set_yticks([bottom + (loc - low) / (high - low) * (top - bottom) for loc in locs],
+                              [f"{loc:g}" for loc in locs])
+    fig.subplots_adjust(wspace=0, hspace=0)
+    return fig, axes
+
+# ============================================================================
+# Timing
+# ============================================================================
+
+def _render_seconds(draw, dpi=100):
+    """Time drawing a figure and encoding it as a PNG."""
+    import matplotlib.pyplot as plt
+
+    start = time.perf_counter()
+    fig, ax = plt.subplots(figsize=(6, 4))
+    draw(ax)
+    fig.savefig(io.BytesIO(), format='png', dpi=dpi)
+    plt.close(fig)
+    return time.perf_counter() - start
+
+def main():
+    """Main function."""
+    import argparse
+    import matplotlib
+    matplotlib.use('Agg')
+
+    parser = argparse.ArgumentParser(description='Time the large-data plotting helpers against plain matplotlib')
+    parser.add_argument('--points', type=int, default=10_000, help='Smallest number of points (default: 10000)')
+    parser.add_argument('--factor', type=int, default=100, help='Growth from the smallest to the largest size (default: 100)')
+    parser.add_argument('--steps', type=int, default=3, help='Number of sizes, spaced geometrically (default: 3)')
+    parser.add_argument('--skip-plain', action='store_true', help="Don't time plain ax.scatter/ax.hist (slow at large sizes)")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='  📉 %(message)s')
+
+    steps = max(2, args.steps)
+    sizes = [int(round(args.points * args.factor ** (i / (steps - 1)))) for i in range(steps)]
+    rng = np.random.default_rng(42)
+
+    print("=" * 60)
+    print("Large-Data Plotting Helpers")
+    print("=" * 60)
+    print()
+
+    rows = []
+    for n in sizes:
+        x = rng.normal(size=n)
+        y = 0.7 * x + rng.normal(scale=0.5, size=n)
+        print(f"{n:,} points")
+        row = {'points': n}
+        row['scatter'] = _render_seconds(lambda ax: scatter(ax, x, y, s=5, alpha=0.5))
+        row['hist'] = _render_seconds(lambda ax: hist(ax, x, bins=50, edgecolor='black'))
+        if not args.skip_plain:
+            row['plain_scatter'] = _render_seconds(lambda ax: ax.scatter(x, y, s=5, alpha=0.5))
+            row['plain_hist'] = _render_seconds(lambda ax: ax.hist(x, bins=50, edgecolor='black'))
+        rows.append(row)
+
+    print()
+    header = f"{'points':>12} {'scatter':>9} {'hist':>9}"
+    if not args.skip_plain:
+        header += f" {'plain scatter':>14} {'plain hist':>11}"
+    print(header)
+    for row in rows:
+        line = f"{row['points']:>12,} {row['scatter']:>8.3f}s {row['hist']:>8.3f}s"
+        if not args.skip_plain:
+            line += f" {row['plain_scatter']:>13.3f}s {row['plain_hist']:>10.3f}s"
+        print(line)
+
+    growth = rows[-1]['scatter'] / rows[0]['scatter'] if rows[0]['scatter'] else 0.0
+    print()
+    print("=" * 60)
+    print(f"✨ {sizes[-1] // sizes[0]}x the points: helper scatter time x{growth:.1f}")
+    print("=" * 60)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Single-pass block index for the book's markdown files.
+
+index_markdown() walks a chapter once, line by line, and records its code
+blocks (with the **Output:** section attached to each Python block), image
+references and display-math delimiters. The executor and the cleanup scripts
+all work from this index instead of re-scanning the file with their own
+regexes, and rewrite files with apply_edits(), which does a single join.
+"""
+
+import re
+
+FENCE_RE = re.compile(r'^(`{3,}|~{3,})[ \t]*([^\n]*?)[ \t]*\n?$')
+IMAGE_RE = re.compile(r'!\[([^\]\n]*)\]\(([^)\s]+)\)')
+INLINE_OUTPUT_RE = re.compile(r'^`(.*)`[ \t]*\n?$')
+LINK_RE = re.compile(r'^\[([^\]\n]*)\]\(([^)\s]+)\)[ \t]*\n?$')
+OUTPUT_MARKER = '**Output:**'
+MATH_DELIMITERS = ('$$', '\\[', '\\]')
+IMAGE_DIRECTIVES = ('figure', 'image')
+
+def _line_offsets(text):
+    """Split text into lines (keeping newlines) and their start offsets."""
+    lines = text.splitlines(keepends=True)
+    offsets = []
+    pos = 0
+    for line in lines:
+        offsets.append(pos)
+        pos += len(line)
+    return lines, offsets
+
+def _is_blank(line):
+    return not line.strip()
+
+def _closes(line, fence):
+    """Check whether line closes a fence opened with the given marker."""
+    stripped = line.rstrip()
+    return (
+        stripped.startswith(fence)
+        and set(stripped) == {fence[0]}
+    )
+
+def _parse_output(lines, offsets, start_line, section_start, text_length, images):
+    """Parse an **Output:** section starting at lines[start_line].
+
+    A section is the marker line followed by at most one text item (an
+    inline `...` line or a plain ``` fence), spill-file links and plot
+    images, separated by blank lines. Plot images are also appended to the
+    images list. Returns (output, next_line).
+    """
+    marker_line = lines[start_line]
+    output = {
+        'start': section_start,
+        'marker': offsets[start_line],
+        'end': None,
+        'text': None,
+        'images': [],
+        'links': [],
+        'is_error': False,
+    }
+
+    rest = marker_line[len(OUTPUT_MARKER):].strip()
+    i = start_line + 1
+    inline = INLINE_OUTPUT_RE.match(rest) if rest else None
+    if inline:
+        output['text'] = inline.group(1)
+    else:
+        while True:
+            j = i
+            while j < len(lines) and _is_blank(lines[j]):
+                j += 1
+            if j >= len(lines):
+                break
+            line = lines[j]
+            image = IMAGE_RE.fullmatch(line.rstrip())
+            link = LINK_RE.match(line)
+            inline = INLINE_OUTPUT_RE.match(line)
+            if output['text'] is None and not output['images'] and line.rstrip() == '```':
+                # Plain fenced output block
+                k = j + 1
+                while k < len(lines) and lines[k].rstrip() != '```':
+                    k += 1
+                if k >= len(lines):
+                    break
+                output['text'] = ''.join(lines[j + 1:k]).rstrip('\n')
+                i = k + 1
+            elif output['text'] is None and not output['images'] and inline:
+                output['text'] = inline.group(1)
+                i = j + 1
+            elif image:
+                output['images'].append(image.group(2))
+                images.append({
+                    'start': offsets[j], 'end': offsets[j] + image.end(),
+                    'alt': image.group(1), 'path': image.group(2),
+                })
+                i = j + 1
+            elif link and not line.startswith('!'):
+                output['links'].append(link.group(2))
+                i = j + 1
+            else:
+                break
+
+    # The section swallows the blank lines that follow it
+    while i < len(lines) and _is_blank(lines[i]):
+        i += 1
+    output['end'] = offsets[i] if i < len(lines) else text_length
+    output['is_error'] = (output['text'] or '').startswith('Error:')
+    return output, i
+
+def index_markdown(text):
+    """Build the block index of a markdown document in one pass.
+
+    Returns a dict with:
+    - 'code_blocks': fenced code blocks as dicts with 'code', 'start', 'end'
+      (offset just after the closing fence), 'full_match', 'language', 'line'
+      and, for Python blocks, 'output' (the attached output section or None)
+    - 'outputs': every **Output:** section, with 'start' (end of its code
+      block), 'end' (after trailing blank lines), 'text', 'images', 'links'
+      and 'is_error'
+    - 'images': image references (markdown images and figure/image
+      directives) as dicts with 'start', 'end', 'alt', 'path'
+    - 'math': display-math delimiter lines ($$, \\[, \\]) as dicts with
+      'start', 'end' (excluding the newline), 'delimiter'
+    Code inside fences is never scanned for images or math. MyST directive
+    fences (```{name}) hold markdown, so their content is scanned.
+    """
+    lines, offsets = _line_offsets(text)
+    index = {'code_blocks': [], 'outputs': [], 'images': [], 'math': []}
+    directives = []  # stack of open directive fences
+    i = 0
+
+    while i < len(lines):
+        line = lines[i]
+        fence = FENCE_RE.match(line)
+
+        if fence and directives and not fence.group(2) and _closes(line, directives[-1]):
+            directives.pop()
+            i += 1
+            continue
+
+        if fence:
+            marker, info = fence.group(1), fence.group(2)
+            if info.startswith('{'):
+                # MyST directive: content is markdown, keep scanning inside
+                directives.append(marker)
+                name, _, argument = info[1:].partition('}')
+                argument = argument.strip()
+                if name in IMAGE_DIRECTIVES and argument:
+                    start = offsets[i] + line.index(argument)
+                    index['images'].append({
+                        'start': start, 'end': start + len(argument),
+                        'alt': '', 'path': argument,
+                    })
+                i += 1
+                continue
+
+            # Code fence: find the closing line
+            j = i + 1
+            while j < len(lines) and not _closes(lines[j], marker):
+                j += 1
+            start = offsets[i]
+            code_start = start + len(line)
+            if j < len(lines):
+                code_end = offsets[j]
+                end = code_end + len(lines[j].rstrip('\n'))
+            else:
+                code_end = end = len(text)
+            language = info.split()[0] if info else ''
+            block = {
+                'code': text[code_start:code_end],
+                'start': start,
+                'end': end,
+                'full_match': text[start:end],
+                'language': language,
+                'line': i + 1,
+                'output': None,
+            }
+            index['code_blocks'].append(block)
+            i = j + 1
+
+            if language == 'python':
+                k = i
+                while k < len(lines) and _is_blank(lines[k]):
+                    k += 1
+                if k < len(lines) and lines[k].startswith(OUTPUT_MARKER):
+                    output, i = _parse_output(lines, offsets, k, end, len(text), index['images'])
+                    block['output'] = output
+                    index['outputs'].append(output)
+            continue
+
+        delimiter = line.strip()
+        if delimiter in MATH_DELIMITERS:
+            start = offsets[i] + line.index(delimiter)
+            index['math'].append({
+                'start': start, 'end': start + len(delimiter),
+                'delimiter': delimiter,
+            })
+        elif '![' in line:
+            for match in IMAGE_RE.finditer(line):
+                index['images'].append({
+                    'start': offsets[i] + match.start(), 'end': offsets[i] + match.end(),
+                    'alt': match.group(1), 'path': match.group(2),
+                })
+        i += 1
+
+    return index
+
+def python_blocks(index):
+    """Return the Python code blocks of an index."""
+    return [block for block in index['code_blocks'] if block['language'] == 'python']
+
+def apply_edits(text, edits):
+    """Apply non-overlapping (start, end, replacement) edits with one join."""
+    pieces = []
+    pos = 0
+    for start, end, replacement in sorted(edits, key=lambda edit: (edit[0], edit[1])):
+        pieces.append(text[pos:start])
+        pieces.append(replacement)
+        pos = end
+    pieces.append(text[pos:])
+    return ''.join(pieces)
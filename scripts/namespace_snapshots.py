@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Save and restore the namespace of an executing chapter file.
+
+The executor can checkpoint the globals after each code block so that, when
+only block k changed, it restores the state after block k-1 instead of
+replaying every block before it. Values are pickled (with dill when it is
+installed), NumPy arrays are stored as .npy files, modules are recorded by
+name and re-imported, and the global random states are saved too. Anything
+that can't be serialized makes save_namespace() return False, and the
+executor falls back to a full replay. Without dill, functions and lambdas
+defined in a block can't be pickled, so no checkpoint is saved from that
+block onward (HAS_DILL tells callers whether to warn).
+
+The executor keeps one directory of snapshots per chapter and calls
+prune_snapshots() after each run, so only the current blocks' checkpoints
+stay on disk.
+"""
+
+import importlib
+import pickle
+import random
+import shutil
+import types
+from pathlib import Path
+
+try:
+    import dill as serializer
+except ImportError:
+    serializer = pickle
+HAS_DILL = serializer is not pickle
+
+SKIPPED_NAMES = {'__builtins__'}
+
+def save_namespace(namespace, snapshot_dir):
+    """Write a snapshot of namespace to snapshot_dir.
+
+    Returns True on success, False if some value can't be serialized (in
+    which case nothing is left on disk).
+    """
+    import numpy as np
+
+    modules = {}
+    arrays = {}
+    state = {}
+    for name, value in namespace.items():
+        if name in SKIPPED_NAMES:
+            continue
+        if isinstance(value, types.ModuleType):
+            modules[name] = value.__name__
+        elif isinstance(value, np.ndarray) and not value.dtype.hasobject:
+            arrays[name] = value
+        else:
+            state[name] = value
+
+    payload = {
+        'modules': modules,
+        'arrays': sorted(arrays),
+        'state': state,
+        'numpy_random': np.random.get_state(),
+        'python_random': random.getstate(),
+    }
+    try:
+        data = serializer.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception:
+        return False
+
+    # Write to a temporary directory first so a snapshot is never half-written
+    snapshot_dir = Path(snapshot_dir)
+    tmp_dir = snapshot_dir.with_name(snapshot_dir.name + '.tmp')
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    try:
+        (tmp_dir / 'arrays').mkdir(parents=True)
+        for i, name in enumerate(payload['arrays']):
+            np.save(tmp_dir / 'arrays' / f'{i}.npy', arrays[name], allow_pickle=False)
+        with open(tmp_dir / 'namespace.pkl', 'wb') as f:
+            f.write(data)
+        shutil.rmtree(snapshot_dir, ignore_errors=True)
+        tmp_dir.rename(snapshot_dir)
+    except OSError:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        return False
+    return True
+
+def restore_namespace(namespace, snapshot_dir):
+    """Replace the contents of namespace with a saved snapshot.
+
+    Returns True on success. On failure namespace is left untouched.
+    """
+    import numpy as np
+
+    snapshot_dir = Path(snapshot_dir)
+    try:
+        with open(snapshot_dir / 'namespace.pkl', 'rb') as f:
+            payload = serializer.loads(f.read())
+        restored = {name: importlib.import_module(module) for name, module in payload['modules'].items()}
+        for i, name in enumerate(payload['arrays']):
+            restored[name] = np.load(snapshot_dir / 'arrays' / f'{i}.npy', allow_pickle=False)
+        restored.update(payload['state'])
+    except Exception:
+        return False
+
+    builtins = namespace.get('__builtins__')
+    namespace.clear()
+    if builtins is not None:
+        namespace['__builtins__'] = builtins
+    namespace.update(restored)
+    np.random.set_state(payload['numpy_random'])
+    random.setstate(payload['python_random'])
+    return True
+
+def has_snapshot(snapshot_dir):
+    """Check whether a complete snapshot exists."""
+    return (Path(snapshot_dir) / 'namespace.pkl').exists()
+
+def prune_snapshots(parent_dir, keep):
+    """Delete the snapshots in parent_dir whose name is not in keep.
+
+    Returns the number of snapshot directories removed.
+    """
+    parent_dir = Path(parent_dir)
+    if not parent_dir.is_dir():
+        return 0
+    removed = 0
+    for path in parent_dir.iterdir():
+        if path.is_dir() and path.name not in keep:
+            shutil.rmtree(path, ignore_errors=True)
+            removed += 1
+    return removed
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Export executed chapters as Jupyter notebooks.
+
+build_notebook() turns a chapter and the executor's per-block results into
+an nbformat v4 notebook: prose becomes markdown cells (without the
+**Output:** sections), Python blocks become code cells with real `stream`,
+`error` and `display_data` (image/png) outputs. export_notebook() writes it
+as .ipynb, or as a MyST notebook (.md with {code-cell} directives) whose
+outputs live in a jupyter-cache. With jupyter-cache installed (it ships with
+jupyter-book), the notebook is also stored in the cache.
+
+write_build_config() turns the notebooks directory into a buildable book: a
+copy of _toc.yml and of _config.yml with `execute_notebooks: cache` pointed
+at the same jupyter-cache, so
+
+    jupyter-book build _build/notebooks
+
+renders the exported notebooks and takes every output from the cache
+instead of executing the pages. The main book (the .md chapters with their
+**Output:** sections, `execute_notebooks: off`) is built as before.
+
+Notebooks mirror the book layout under the notebooks directory, e.g.
+part1/ch01_datasets.md -> _build/notebooks/part1/ch01_datasets.ipynb, and
+relative image links are rewritten to stay valid from there.
+"""
+
+import base64
+import json
+import os
+import re
+from pathlib import Path
+from markdown_blocks import index_markdown, python_blocks, apply_edits
+from safe_write import write_text
+
+DEFAULT_NOTEBOOK_DIR = Path('_build/notebooks')
+DEFAULT_JUPYTER_CACHE = Path('_build/.jupyter_cache')  # jupyter-book's default execute.cache
+BOOK_CONFIG = Path('_config.yml')
+BOOK_TOC = Path('_toc.yml')
+NOTEBOOK_FORMATS = ('ipynb', 'myst')
+
+KERNELSPEC = {'display_name': 'Python 3', 'language': 'python', 'name': 'python3'}
+FRONT_MATTER_RE = re.compile(r'---\n(.*?)\n---\n', re.DOTALL)
+ERROR_RE = re.compile(r'Error: (\w+): (.*)', re.DOTALL)
+
+def notebook_path(notebook_dir, filepath, notebook_format='ipynb'):
+    """Path of a chapter's notebook, mirroring its location in the book."""
+    relative = Path(filepath)
+    if relative.is_absolute():
+        try:
+            relative = relative.relative_to(Path.cwd())
+        except ValueError:
+            relative = Path(relative.name)
+    suffix = '.ipynb' if notebook_format == 'ipynb' else '.md'
+    return Path(notebook_dir) / relative.with_suffix(suffix)
+
+def _split_front_matter(markdown_text):
+    """Return (front matter YAML or None, text without it)."""
+    match = FRONT_MATTER_RE.match(markdown_text)
+    if not match:
+        return None, markdown_text
+    return match.group(1), markdown_text[match.end():]
+
+def _relocate_images(markdown_text, index, source_dir, target_dir):
+    """Rewrite relative image paths so they resolve from target_dir."""
+    edits = []
+    for image in index['images']:
+        path = image['path']
+        if '://' in path or path.startswith(('/', 'data:')):
+            continue
+        moved = Path(os.path.relpath(source_dir / path, target_dir)).as_posix()
+        original = markdown_text[image['start']:image['end']]
+        edits.append((image['start'], image['end'], original.replace(path, moved, 1)))
+    return apply_edits(markdown_text, edits)
+
+def _source_lines(text):
+    """nbformat stores sources as a list of lines (keeping newlines)."""
+    return text.splitlines(keepends=True)
+
+def code_cell_outputs(output_text, plot_path, spill_path=None):
+    """Convert one block's executor result into nbformat outputs."""
+    outputs = []
+    match = ERROR_RE.match(output_text or '')
+    if match:
+        outputs.append({
+            'output_type': 'error',
+            'ename': match.group(1),
+            'evalue': match.group(2),
+            'traceback': [output_text],
+        })
+    elif output_text and output_text != "(No output)":
+        if spill_path and Path(spill_path).exists():
+            # The spill file holds the complete, untruncated output
+            output_text = Path(spill_path).read_text(encoding='utf-8').rstrip('\n')
+        outputs.append({'output_type': 'stream', 'name': 'stdout', 'text': _source_lines(output_text + '\n')})
+    if plot_path:
+        outputs.append({
+            'output_type': 'display_data',
+            'data': {
+                'image/png': base64.b64encode(Path(plot_path).read_bytes()).decode('ascii'),
+                'text/plain': ['<Figure>'],
+            },
+            'metadata': {},
+        })
+    return outputs
+
+def build_notebook(markdown_text, results, source_dir='.', target_dir='.'):
+    """Build an executed nbformat v4 notebook from a chapter.
+
+    results holds one (output_text, plot_path, spill_path) tuple per Python
+    block, as produced by the executor. Returns (notebook dict, front matter
+    YAML or None).
+    """
+    front, body = _split_front_matter(markdown_text)
+    index = index_markdown(body)
+    body = _relocate_images(body, index, Path(source_dir), Path(target_dir))
+    index = index_markdown(body)
+    blocks = python_blocks(index)
+
+    cells = []
+
+    def add_markdown(text):
+        text = text.strip('\n')
+        if text.strip():
+            cells.append({'cell_type': 'markdown', 'metadata': {}, 'source': _source_lines(text)})
+
+    pos = 0
+    for count, (block, result) in enumerate(zip(blocks, results), start=1):
+        add_markdown(body[pos:block['start']])
+        cells.append({
+            'cell_type': 'code',
+            'execution_count': count,
+            'metadata': {},
+            'outputs': code_cell_outputs(*result),
+            'source': _source_lines(block['code'].rstrip('\n')),
+        })
+        pos = block['output']['end'] if block['output'] else block['end']
+    add_markdown(body[pos:])
+
+    for number, cell in enumerate(cells):
+        cell['id'] = f"cell-{number}"
+
+    notebook = {
+        'cells': cells,
+        'metadata': {
+            'kernelspec': dict(KERNELSPEC),
+            'language_info': {'name': 'python', 'pygments_lexer': 'ipython3'},
+        },
+        'nbformat': 4,
+        'nbformat_minor': 5,
+    }
+    return notebook, front
+
+def notebook_to_myst(notebook, front=None):
+    """Render a notebook as MyST markdown (outputs are not part of the text)."""
+    header = front.rstrip('\n') + '\n' if front else ''
+    header += (
+        "jupytext:\n"
+        "  text_representation:\n"
+        "    extension: .md\n"
+        "    format_name: myst\n"
+        "kernelspec:\n"
+        + ''.join(f"  {key}: {value}\n" for key, value in KERNELSPEC.items())
+    )
+    parts = []
+    for cell in notebook['cells']:
+        source = ''.join(cell['source'])
+        if cell['cell_type'] == 'code':
+            parts.append(f"```{{code-cell}} ipython3\n{source}\n```")
+        else:
+            parts.append(source)
+    return f"---\n{header}---\n\n" + '\n\n'.join(parts) + '\n'
+
+def cache_notebook(cache_path, notebook, uri):
+    """Store an executed notebook in a jupyter-cache.
+
+    Returns False if jupyter-cache (or nbformat) is not installed.
+    """
+    try:
+        import nbformat
+        from jupyter_cache import get_cache
+        from jupyter_cache.base import CacheBundleIn
+    except ImportError:
+        return False
+    cache = get_cache(str(cache_path))
+    bundle = CacheBundleIn(nb=nbformat.from_dict(notebook), uri=str(uri))
+    cache.cache_notebook_bundle(bundle, check_validity=False, overwrite=True)
+    return True
+
+def export_notebook(markdown_text, results, filepath, notebook_dir=DEFAULT_NOTEBOOK_DIR, notebook_format='ipynb',
+                    cache_path=None):
+    """Write a chapter's executed notebook (and cache it if cache_path is set).
+
+    Returns (notebook path, cached) where cached is None without a
+    cache_path and False when jupyter-cache is not installed.
+    """
+    path = notebook_path(notebook_dir, filepath, notebook_format)
+    notebook, front = build_notebook(markdown_text, results, Path(filepath).parent, path.parent)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if notebook_format == 'myst':
+        write_text(path, notebook_to_myst(notebook, front))
+    else:
+        write_text(path, json.dumps(notebook, indent=1, ensure_ascii=False) + '\n')
+    cached = cache_notebook(cache_path, notebook, path) if cache_path else None
+    return path, cached
+
+def write_build_config(notebook_dir=DEFAULT_NOTEBOOK_DIR, cache_path=DEFAULT_JUPYTER_CACHE, notebook_format='ipynb',
+                       config_path=BOOK_CONFIG, toc_path=BOOK_TOC):
+    """Write _config.yml and _toc.yml into notebook_dir to build the exported notebooks.
+
+    The config is the book's, with execution switched to `cache` on
+    cache_path (or `off` without a cache, where .ipynb outputs are used as
+    they are) and its file paths made relative to notebook_dir. Returns the
+    TOC pages that have no exported notebook yet, or None if PyYAML is not
+    installed or the book's config or TOC can't be read.
+    """
+    from book_schedule import toc_files
+
+    try:
+        import yaml
+        with open(config_path, 'r', encoding='utf-8') as f:
+            config = yaml.safe_load(f) or {}
+        toc_text = Path(toc_path).read_text(encoding='utf-8')
+    except (ImportError, OSError, ValueError):
+        return None
+
+    notebook_dir = Path(notebook_dir)
+    book_root = Path(config_path).parent
+    execute = dict(config.get('execute') or {})
+    if cache_path is not None:
+        execute['execute_notebooks'] = 'cache'
+        execute['cache'] = str(Path(cache_path).resolve())
+    else:
+        execute['execute_notebooks'] = 'off'
+    config['execute'] = execute
+    if config.get('bibtex_bibfiles'):
+        config['bibtex_bibfiles'] = [
+            Path(os.path.relpath(book_root / name, notebook_dir)).as_posix() for name in config['bibtex_bibfiles']
+        ]
+
+    notebook_dir.mkdir(parents=True, exist_ok=True)
+    header = "# Generated by execute_and_add_outputs.py --notebooks; edit the book's copy instead\n"
+    write_text(notebook_dir / '_config.yml', header + yaml.safe_dump(config, sort_keys=False, allow_unicode=True))
+    write_text(notebook_dir / '_toc.yml', header + toc_text)
+    return [
+        filepath for filepath in toc_files(toc_path) or []
+        if not notebook_path(notebook_dir, filepath, notebook_format).exists()
+    ]
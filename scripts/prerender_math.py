@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Pre-render the book's math to SVG so pages don't wait for MathJax.
+
+Every display ($$...$$) and inline ($...$) expression outside code blocks,
+output sections and inline code is rendered once with matplotlib's mathtext
+and cached as .math_cache/<hash>.svg, keyed by the normalized expression and
+whether it is display math. Re-runs only render new expressions. Expressions
+mathtext can't handle (e.g. aligned environments) are listed with their
+file and line and written to math_report.json; they keep being typeset by
+MathJax.
+
+The same module is a Sphinx extension that swaps math nodes for their
+cached SVG in HTML builds. Enable it in _config.yml:
+
+    sphinx:
+      local_extensions:
+        prerender_math: scripts/
+
+Usage:
+    python scripts/prerender_math.py                     # every page in _toc.yml
+    python scripts/prerender_math.py part3/ch09_bayesian_normal.md --force
+"""
+
+import hashlib
+import io
+import json
+import re
+import sys
+from pathlib import Path
+
+DEFAULT_CACHE_DIR = Path('.math_cache')
+DEFAULT_REPORT = Path('math_report.json')
+FONTSET = 'cm'  # Computer Modern, closest to MathJax's TeX fonts
+INLINE_SIZE = 12
+DISPLAY_SIZE = 14
+
+DISPLAY_RE = re.compile(r'(?<!\\)\$\$(.+?)(?<!\\)\$\$', re.DOTALL)
+# Pandoc's rule: no space after the opening $, none before the closing $,
+# and no digit right after it, so "$5 and $10" is not math
+INLINE_RE = re.compile(r'(?<![\\$])\$(?![\s$])([^$\n]+?)(?<![\s\\])\$(?!\d)')
+INLINE_CODE_RE = re.compile(r'(`+)(?!`).+?(?<!`)\1(?!`)', re.DOTALL)
+
+def normalize_expression(expression):
+    """Collapse whitespace, so reflowed source maps to the same cache entry."""
+    return ' '.join(expression.split())
+
+def math_key(expression, display):
+    """Cache key of an expression."""
+    text = f"{FONTSET}|{'display' if display else 'inline'}|{normalize_expression(expression)}"
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+
+def _mask(text, spans):
+    """Blank out spans (keeping newlines, so offsets and line numbers stay valid)."""
+    chars = list(text)
+    for start, end in spans:
+        for i in range(start, end):
+            if chars[i] != '\n':
+                chars[i] = ' '
+    return ''.join(chars)
+
+def extract_math(markdown_text):
+    """Find the math expressions of a chapter.
+
+    Returns dicts with 'expression', 'display' and 'line', in order.
+    """
+    from markdown_blocks import index_markdown
+
+    index = index_markdown(markdown_text)
+    spans = [(block['start'], block['end']) for block in index['code_blocks']]
+    spans += [(output['start'], output['end']) for output in index['outputs']]
+    masked = _mask(markdown_text, spans)
+    masked = _mask(masked, [match.span() for match in INLINE_CODE_RE.finditer(masked)])
+
+    found = []
+    for match in DISPLAY_RE.finditer(masked):
+        found.append((match.start(), match.group(1), True))
+    masked = _mask(masked, [match.span() for match in DISPLAY_RE.finditer(masked)])
+    for match in INLINE_RE.finditer(masked):
+        found.append((match.start(), match.group(1), False))
+
+    # Masking never touches math, so the matched text is the source text
+    return [
+        {
+            'expression': expression,
+            'display': display,
+            'line': markdown_text.count('\n', 0, start) + 1,
+        }
+        for start, expression, display in sorted(found)
+        if expression.strip()
+    ]
+
+def render_svg(expression, display):
+    """Render one expression with mathtext. Returns (svg text, depth in pt).
+
+    Raises ValueError if mathtext can't parse it.
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    from matplotlib import mathtext
+    from matplotlib.font_manager import FontProperties
+
+    prop = FontProperties(size=DISPLAY_SIZE if display else INLINE_SIZE)
+    buffer = io.BytesIO()
+    with matplotlib.rc_context({'mathtext.fontset': FONTSET, 'svg.fonttype': 'path', 'svg.hashsalt': 'math'}):
+        depth = mathtext.math_to_image(f"${normalize_expression(expression)}$", buffer, prop=prop, format='svg')
+    return buffer.getvalue().decode('utf-8'), depth
+
+def prerender(files, cache_dir=DEFAULT_CACHE_DIR, force=False, log=print):
+    """Render every expression of the files that isn't cached yet.
+
+    Returns a dict with 'expressions' (occurrences), 'unique', 'rendered',
+    'cached' and 'failures' (dicts with file, line, expression, error).
+    """
+    from safe_write import write_text
+
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = cache_dir / 'manifest.json'
+    try:
+        manifest = json.loads(manifest_path.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        manifest = {}
+
+    summary = {'expressions': 0, 'unique': 0, 'rendered': 0, 'cached': 0, 'failures': []}
+    seen = {}
+    for filepath in files:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            found = extract_math(f.read())
+        summary['expressions'] += len(found)
+        for item in found:
+            key = math_key(item['expression'], item['display'])
+            if key in seen:
+                error = seen[key]
+            elif not force and key in manifest and (cache_dir / f"{key}.svg").exists():
+                error = None
+                summary['cached'] += 1
+            else:
+                try:
+                    svg, depth = render_svg(item['expression'], item['display'])
+                except Exception as e:
+                    # mathtext puts the expression and a caret first, the reason last
+                    lines = [line for line in str(e).splitlines() if line.strip()]
+                    error = f"{type(e).__name__}: {lines[-1] if lines else ''}"
+                else:
+                    error = None
+                    write_text(cache_dir / f"{key}.svg", svg)
+                    manifest[key] = {
+                        'expression': normalize_expression(item['expression']),
+                        'display': item['display'],
+                        'depth': round(depth, 3),
+                    }
+                    summary['rendered'] += 1
+            seen[key] = error
+            if error:
+                summary['failures'].append({
+                    'file': Path(filepath).as_posix(), 'line': item['line'],
+                    'expression': normalize_expression(item['expression']),
+                    'display': item['display'], 'error': error,
+                })
+    summary['unique'] = len(seen)
+    write_text(manifest_path, json.dumps(manifest, indent=1, sort_keys=True) + '\n')
+    return summary
+
+# ============================================================================
+# Sphinx extension
+# ============================================================================
+
+def _replace_math_nodes(app, doctree, docname):
+    """Swap math nodes for their cached SVG (HTML builders only).
+
+    Inline SVGs are lowered by their depth from the manifest, so their
+    baseline lines up with the surrounding text.
+    """
+    if app.builder.format != 'html':
+        return
+    from docutils import nodes
+
+    cache_dir = Path(app.confdir) / app.config.math_prerender_cache
+    if not cache_dir.is_dir():
+        return
+    try:
+        manifest = json.loads((cache_dir / 'manifest.json').read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        manifest = {}
+    findall = getattr(doctree, 'findall', None) or doctree.traverse
+    for node in list(findall(nodes.math)) + list(findall(nodes.math_block)):
+        display = isinstance(node, nodes.math_block)
+        key = math_key(node.astext(), display)
+        svg_path = cache_dir / f"{key}.svg"
+        if not svg_path.exists():
+            continue  # left to MathJax
+        svg = svg_path.read_text(encoding='utf-8')
+        svg = svg[svg.index('<svg'):]  # drop the XML prolog and doctype
+        if display:
+            html = f'<div class="math notranslate prerendered-math">{svg}</div>'
+        else:
+            depth = manifest.get(key, {}).get('depth', 0)
+            style = f' style="vertical-align: -{depth}pt"' if depth else ''
+            html = f'<span class="math notranslate prerendered-math"{style}>{svg}</span>'
+        node.replace_self(nodes.raw('', html, format='html'))
+
+def setup(app):
+    """Sphinx entry point."""
+    app.add_config_value('math_prerender_cache', str(DEFAULT_CACHE_DIR), 'env')
+    app.connect('doctree-resolved', _replace_math_nodes)
+    return {'parallel_read_safe': True, 'parallel_write_safe': True}
+
+def main():
+    """Main function."""
+    import argparse
+    from book_schedule import DEFAULT_TOC, toc_files
+
+    parser = argparse.ArgumentParser(description='Pre-render display and inline math to cached SVG files')
+    parser.add_argument('files', nargs='*', help='Markdown files (default: every page in _toc.yml)')
+    parser.add_argument('--cache-dir', default=str(DEFAULT_CACHE_DIR), help='SVG cache directory (default: .math_cache)')
+    parser.add_argument('--report', default=str(DEFAULT_REPORT), help='Failure report (default: math_report.json)')
+    parser.add_argument('--toc', default=str(DEFAULT_TOC), help='Table of contents listing the default files (default: _toc.yml)')
+    parser.add_argument('--force', action='store_true', help='Re-render cached expressions too')
+    parser.add_argument('--strict', action='store_true', help='Exit with status 1 if any expression fails to render')
+
+    args = parser.parse_args()
+    files = [Path(f) for f in args.files] if args.files else (toc_files(Path(args.toc)) or [])
+    files = [filepath for filepath in files if filepath.exists()]
+    if not files:
+        print("No files to process!")
+        return 1
+
+    print("=" * 60)
+    print("Pre-render Math")
+    print("=" * 60)
+    print()
+
+    summary = prerender(files, Path(args.cache_dir), force=args.force)
+
+    for failure in summary['failures']:
+        kind = 'display' if failure['display'] else 'inline'
+        print(f"  ❌ {failure['file']}:{failure['line']} ({kind}) {failure['error']}")
+        print(f"      {failure['expression'][:100]}")
+    report_path = Path(args.report)
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump({key: summary[key] for key in ('expressions', 'unique', 'rendered', 'cached', 'failures')}, f, indent=2)
+        f.write('\n')
+
+    print()
+    print("=" * 60)
+    print(f"✨ {summary['expressions']} expression(s), {summary['unique']} unique: "
+          f"{summary['rendered']} rendered, {summary['cached']} cached, {len(summary['failures'])} failed")
+    print(f"   Report written to {report_path}")
+    print("=" * 60)
+
+    return 1 if args.strict and summary['failures'] else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
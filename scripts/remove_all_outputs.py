@@ -3,30 +3,17 @@
 Script to remove all outputs from markdown files.
 """
 
-import re
 import sys
 from pathlib import Path
+from markdown_blocks import index_markdown, apply_edits
+from safe_write import write_text
 
-def remove_all_outputs(markdown_text):
-    """Remove all output sections."""
-    # Pattern to find all outputs (both inline and block format)
-    pattern1 = r'\n\n\*\*Output:\*\* `[^`]+`\n+'
-    pattern2 = r'\n\n\*\*Output:\*\*\n```\n[^`]+```\n+'
-    pattern3 = r'\n\n\*\*Output:\*\*\n```\n[^`]+```\n\n!\[Plot\]\(images/[^\)]+\)\n+'
-    pattern4 = r'\n\n\*\*Output:\*\*\n`[^`]+`\n\n!\[Plot\]\(images/[^\)]+\)\n+'
-    pattern5 = r'\n\n\*\*Output:\*\*\n!\[Plot\]\(images/[^\)]+\)\n+'
-    
-    modified = markdown_text
-    total_count = 0
-    
-    # Try all patterns
-    for pattern in [pattern3, pattern4, pattern5, pattern2, pattern1]:
-        count = len(re.findall(pattern, modified, re.DOTALL))
-        if count > 0:
-            modified = re.sub(pattern, '\n\n', modified, flags=re.DOTALL)
-            total_count += count
-    
-    return modified, total_count
+def remove_all_outputs(markdown_text, index=None):
+    """Remove all output sections (index: a precomputed index_markdown of the text)."""
+    # Each output section (inline, fenced and/or plot image) is replaced by a blank line
+    outputs = (index or index_markdown(markdown_text))['outputs']
+    edits = [(output['start'], output['end'], '\n\n') for output in outputs]
+    return apply_edits(markdown_text, edits), len(edits)
 
 def main():
     """Main function."""
@@ -63,8 +50,7 @@ def main():
         modified, count = remove_all_outputs(content)
         
         if count > 0:
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(modified)
+            write_text(filepath, modified)
             print(f"{filepath.name}: Removed {count} output(s)")
             total_removed += count
     
@@ -3,34 +3,17 @@
 Script to remove error outputs and re-execute code blocks.
 """
 
-import re
 import sys
 from pathlib import Path
+from markdown_blocks import index_markdown, apply_edits
+from safe_write import write_text
 
-def remove_error_outputs(markdown_text):
-    """Remove output sections that contain errors."""
-    # Pattern to find error outputs (both inline and block format)
-    # Handle cases with optional blank lines before "**Initial"
-    pattern1 = r'\n\n\*\*Output:\*\* `Error:[^`]+`\n+(?=\*\*|##|\n|$)'
-    pattern2 = r'\n\n\*\*Output:\*\*\n```\nError:[^`]+```\n+(?=\*\*|##|\n|$)'
-    
-    modified = markdown_text
-    
-    # Apply pattern1
-    matches1 = list(re.finditer(pattern1, markdown_text))
-    count1 = len(matches1)
-    if count1 > 0:
-        modified = re.sub(pattern1, '\n\n', modified)
-    
-    # Apply pattern2
-    matches2 = list(re.finditer(pattern2, markdown_text, re.DOTALL))
-    count2 = len(matches2)
-    if count2 > 0:
-        modified = re.sub(pattern2, '\n\n', modified, flags=re.DOTALL)
-    
-    count = count1 + count2
-    
-    return modified, count
+def remove_error_outputs(markdown_text, index=None):
+    """Remove output sections that contain errors (index: a precomputed index_markdown of the text)."""
+    # Error outputs (inline or block format) start with "Error:"
+    outputs = (index or index_markdown(markdown_text))['outputs']
+    edits = [(output['start'], output['end'], '\n\n') for output in outputs if output['is_error']]
+    return apply_edits(markdown_text, edits), len(edits)
 
 def main():
     """Main function."""
@@ -67,8 +50,7 @@ def main():
         modified, count = remove_error_outputs(content)
         
         if count > 0:
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(modified)
+            write_text(filepath, modified)
             print(f"{filepath.name}: Removed {count} error output(s)")
             total_removed += count
     
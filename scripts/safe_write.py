@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Atomic, change-only file writes for the scripts that rewrite the book.
+
+write_bytes()/write_text() leave a file untouched (content and mtime) when
+it already holds the new bytes. Otherwise the data goes to a temporary file
+in the same directory, which os.replace() then swaps in, so an interrupted
+run never leaves a half-written chapter or image behind. Because unchanged
+files keep their mtime, Sphinx's incremental build only rebuilds the pages
+a run actually changed.
+"""
+
+import os
+import tempfile
+from pathlib import Path
+
+# Read once: os.umask() can only be queried by setting it
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+def write_bytes(path, data):
+    """Atomically replace path with data unless it already has it. Returns True if written."""
+    path = Path(path)
+    try:
+        if path.stat().st_size == len(data) and path.read_bytes() == data:
+            return False
+        mode = path.stat().st_mode & 0o7777
+    except OSError:
+        mode = 0o666 & ~_UMASK
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{path.name}.", suffix='.tmp', dir=path.parent)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        # mkstemp creates the file as 0600
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    return True
+
+def write_text(path, text, encoding='utf-8'):
+    """write_bytes() for text. Returns True if the file was written."""
+    return write_bytes(path, text.encode(encoding))